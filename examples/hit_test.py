@@ -0,0 +1,36 @@
+import cv2
+from sightvision.module.hand_tracking import HandDetector
+from sightvision.utils.hit_test import HitTestIndex
+
+
+def main():
+    cap = cv2.VideoCapture(0)
+    detector = HandDetector(detection_confidence=0.8, max_hands=2)
+    success, img = cap.read()
+    h, w, _ = img.shape
+
+    # A grid of buttons, each one is a target of the index
+    index = HitTestIndex(w, h)
+    buttons = {}
+    for row in range(6):
+        for col in range(10):
+            bbox = (20 + col * 60, 20 + row * 60, 50, 50)
+            buttons[index.add(bbox)] = bbox
+
+    while True:
+        success, img = cap.read()
+        hands, img = detector.find_hands(img)
+
+        # Every fingertip of every hand in one call
+        hits = index.query_hands(hands)["inside"]
+        pressed = set(hits[hits >= 0].tolist())
+        for target_id, (x, y, bw, bh) in buttons.items():
+            color = (0, 255, 0) if target_id in pressed else (155, 155, 155)
+            cv2.rectangle(img, (x, y), (x + bw, y + bh), color, 1)
+
+        cv2.imshow("Image", img)
+        cv2.waitKey(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import cv2
+from sightvision.module.multi_pose_estimation import MultiPoseDetector
+
+
+def main():
+    cap = cv2.VideoCapture(0)
+    detector = MultiPoseDetector(max_people=4)
+    while True:
+        success, img = cap.read()
+        people = detector.find_poses(img)
+        for person in people:
+            # Every person keeps the same id while it stays in view
+            print(person["id"], person["bbox"], person["center"])
+
+        cv2.imshow("Image", img)
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
+
+    detector.close()
+
+
+if __name__ == "__main__":
+    main()
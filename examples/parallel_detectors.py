@@ -0,0 +1,40 @@
+import cv2
+from sightvision.common.executor import DetectorExecutor
+from sightvision.module.face_mesh import FaceMeshDetector
+from sightvision.module.hand_tracking import HandDetector
+from sightvision.module.pose_estimation import PoseDetector
+
+
+def main():
+    cap = cv2.VideoCapture(0)
+    face_detector = FaceMeshDetector(max_faces=2)
+    hand_detector = HandDetector(max_hands=2)
+    pose_detector = PoseDetector()
+
+    def find_pose(frame):
+        results = pose_detector.process(frame)
+        return pose_detector.find_position(frame, draw=False, results=results)
+
+    with DetectorExecutor() as executor:
+        while True:
+            success, img = cap.read()
+            # Face, hands and pose run at the same time on the same frame
+            results = executor.run(img, {
+                "faces": lambda frame: face_detector.findface_mesh(frame, draw=False)[1],
+                "hands": lambda frame: hand_detector.find_hands(frame, draw=False),
+                "pose": find_pose,
+            })
+
+            lmList, bboxInfo = results["pose"]
+            # Every detector is done with the frame, so it can be drawn on now
+            if bboxInfo:
+                angle = pose_detector.find_angle(img, 12, 14, 16, lmList=lmList)
+            for hand in results["hands"]:
+                fingers = hand_detector.fingersUp(hand)
+
+            cv2.imshow("Image", img)
+            cv2.waitKey(1)
+
+
+if __name__ == "__main__":
+    main()
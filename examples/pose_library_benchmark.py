@@ -0,0 +1,57 @@
+"""
+Measures how long it takes to build a reference pose library and to search it.
+The reference poses are synthetic: a few base poses moved, scaled and jittered.
+"""
+import time
+
+import numpy as np
+
+from sightvision.utils.pose_library import PoseLibrary
+
+LIBRARY_SIZES = (1000, 10000, 100000)
+QUERIES = 200
+BATCH = 64
+K = 5
+
+
+def random_poses(rng, count, base):
+    # Move, scale and jitter the base poses like different people in different places
+    poses = base[rng.integers(0, len(base), count)]
+    poses = poses * rng.uniform(0.5, 2.0, (count, 1, 1)) + rng.uniform(0, 500, (count, 1, 2))
+    return (poses + rng.normal(0, 4, poses.shape)).astype(np.float32)
+
+
+def to_lm_list(pose):
+    return [[index, int(x), int(y), 0] for index, (x, y) in enumerate(pose)]
+
+
+def main():
+    rng = np.random.default_rng(0)
+    base = rng.uniform(0, 300, (20, 33, 2))
+
+    for size in LIBRARY_SIZES:
+        library = PoseLibrary()
+        poses = random_poses(rng, size, base)
+
+        start = time.perf_counter()
+        library.add_many(poses)
+        library.build()
+        build_ms = (time.perf_counter() - start) * 1000
+
+        queries = [to_lm_list(pose) for pose in random_poses(rng, QUERIES, base)]
+        start = time.perf_counter()
+        for lmList in queries:
+            library.query(lmList, k=K)
+        query_ms = (time.perf_counter() - start) * 1000 / QUERIES
+
+        batch = random_poses(rng, BATCH, base)
+        start = time.perf_counter()
+        library.query_batch(batch, k=K)
+        batch_ms = (time.perf_counter() - start) * 1000
+
+        print(f"{size:>7} poses: build {build_ms:8.2f} ms, query {query_ms:6.3f} ms, "
+              f"batch of {BATCH} {batch_ms:7.2f} ms ({library.poses.nbytes / 1024 / 1024:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import sys
+import time
+
+import cv2
+from sightvision.io.wire import HAND_TYPES, ResultEncoder, ResultPublisher, ResultSubscriber
+from sightvision.module.hand_tracking import HandDetector
+
+ADDRESS = "/tmp/sightvision.sock"
+
+
+def publish():
+    cap = cv2.VideoCapture(0)
+    detector = HandDetector(max_hands=2)
+    encoder = ResultEncoder(delta=True)
+    frame_index = 0
+    with ResultPublisher(ADDRESS) as publisher:
+        while True:
+            success, img = cap.read()
+            hands = detector.find_hands(img, draw=False)
+            publisher.publish(encoder.encode_hands(hands, frame_index, time.time()))
+            frame_index += 1
+
+
+def subscribe():
+    with ResultSubscriber(ADDRESS) as subscriber:
+        for result in subscriber:
+            # Landmarks arrive as a (hands, 21, 3) int16 array
+            for landmarks, label in zip(result["landmarks"], result["labels"]):
+                print(result["frame_index"], HAND_TYPES[label], landmarks[8])
+
+
+if __name__ == "__main__":
+    subscribe() if "subscribe" in sys.argv else publish()
@@ -0,0 +1,30 @@
+import cv2
+from sightvision.common.quality import QualityController
+from sightvision.module.hand_tracking import HandDetector
+from sightvision.module.pose_estimation import PoseDetector
+
+
+def main():
+    cap = cv2.VideoCapture(0)
+    hand_detector = HandDetector(max_hands=2)
+    pose_detector = PoseDetector(model_complexity=2)
+
+    # Stay within 33 ms per frame, trading model size and resolution for speed
+    levels = QualityController.default_levels(pose=pose_detector, hands=hand_detector)
+    controller = QualityController(levels, budget_ms=33.0)
+
+    while True:
+        success, img = cap.read()
+        with controller.measure():
+            hands = hand_detector.find_hands(img, draw=False)
+            lmList, bboxInfo = pose_detector.find_position(img, results=pose_detector.process(img))
+
+        state = controller.state
+        cv2.putText(img, f"Level {state['level']} {state['latency_ms'] or 0:.1f} ms", (20, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (25, 220, 255), 1)
+        cv2.imshow("Image", img)
+        cv2.waitKey(1)
+
+
+if __name__ == "__main__":
+    main()
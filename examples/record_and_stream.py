@@ -0,0 +1,35 @@
+import cv2
+from sightvision.io.video_writer import MJPEGServer, VideoFileWriter
+from sightvision.module.hand_tracking import HandDetector
+
+
+def main():
+    cap = cv2.VideoCapture(0)
+    detector = HandDetector(detection_confidence=0.8, max_hands=2)
+
+    # Encoding happens on worker threads, the loop only queues the annotated frames
+    recorder = VideoFileWriter("hands.mp4", fps=30)
+    stream = MJPEGServer(port=8080)
+    print(f"Streaming on {stream.url}")
+
+    try:
+        while True:
+            success, img = cap.read()
+            if not success:
+                break
+            hands, img = detector.find_hands(img)
+            recorder.write(img)
+            stream.write(img)
+
+            cv2.imshow("Image", img)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+    finally:
+        recorder.close()
+        stream.close()
+        print(recorder.metrics)
+        print(stream.metrics)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Compares mediapipe drawing_utils with LandmarkRenderer on a 4K frame with several subjects.
+The landmarks are synthetic, spread over one region per subject.
+"""
+import time
+
+import mediapipe as mp
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+
+from sightvision.utils.rendering import FACE_MESH_EDGES, HAND_EDGES, POSE_EDGES, LandmarkRenderer
+
+WIDTH, HEIGHT = 3840, 2160
+SUBJECTS = 6
+FRAMES = 30
+
+TOPOLOGIES = [
+    ("face mesh", 468, mp.solutions.face_mesh.FACEMESH_CONTOURS, FACE_MESH_EDGES),
+    ("pose", 33, mp.solutions.pose.POSE_CONNECTIONS, POSE_EDGES),
+    ("hands", 21, mp.solutions.hands.HAND_CONNECTIONS, HAND_EDGES),
+]
+
+
+def random_subjects(rng, landmarks):
+    # One region per subject, normalized coordinates like the mediapipe results
+    origins = rng.uniform(0, 0.8, (SUBJECTS, 1, 2))
+    return origins + rng.uniform(0, 0.2, (SUBJECTS, landmarks, 2))
+
+
+def to_landmark_list(points):
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y in points:
+        landmark_list.landmark.add(x=x, y=y, visibility=1.0)
+    return landmark_list
+
+
+def timed(draw):
+    img = np.zeros((HEIGHT, WIDTH, 3), np.uint8)
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        draw(img)
+    return (time.perf_counter() - start) * 1000 / FRAMES
+
+
+def main():
+    rng = np.random.default_rng(0)
+    mp_draw = mp.solutions.drawing_utils
+
+    for name, landmarks, connections, edges in TOPOLOGIES:
+        subjects = random_subjects(rng, landmarks)
+        landmark_lists = [to_landmark_list(points) for points in subjects]
+        pixels = (subjects * (WIDTH, HEIGHT)).astype(np.int32)
+
+        def draw_mediapipe(img):
+            for landmark_list in landmark_lists:
+                mp_draw.draw_landmarks(img, landmark_list, connections)
+
+        fast = LandmarkRenderer(edges)
+        smooth = LandmarkRenderer(edges, antialias=True)
+        print(f"{name:>9} x{SUBJECTS}: drawing_utils {timed(draw_mediapipe):7.2f} ms, "
+              f"renderer {timed(lambda img: fast.draw(img, pixels)):6.2f} ms, "
+              f"antialiased {timed(lambda img: smooth.draw(img, pixels)):6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
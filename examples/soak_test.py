@@ -0,0 +1,108 @@
+"""
+Runs the detectors in bounded memory mode on synthetic video for hours and reports RSS growth.
+The resident set size is sampled from /proc/self/statm, and the slope of a line fitted through
+the samples taken after the warmup is the leak rate. Linux only.
+
+    python soak_test.py --hours 3
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from sightvision.io.video_source import GeneratorSource
+from sightvision.module.face_detection import FaceDetector
+from sightvision.module.face_mesh import FaceMeshDetector
+from sightvision.module.hand_tracking import HandDetector
+from sightvision.module.pose_estimation import PoseDetector
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def rss_mib():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * PAGE_SIZE / 1024 / 1024
+
+
+def synthetic_frames(width, height, subject=None):
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+    def generate(index):
+        frame = background.copy()
+        # Something that moves, so tracking and redetection both get exercised
+        x = int((np.sin(index / 50) + 1) / 2 * (width - 200))
+        y = int((np.cos(index / 70) + 1) / 2 * (height - 200))
+        if subject is not None:
+            h, w = subject.shape[:2]
+            x, y = min(x, width - w), min(y, height - h)
+            frame[y:y + h, x:x + w] = subject
+        else:
+            cv2.circle(frame, (x + 100, y + 100), 80, (60, 120, 200), cv2.FILLED)
+        return frame
+
+    return generate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--hours", type=float, default=3.0, help="Duration of the run.")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--image", help="Image of people pasted on the frames, so the detectors find something.")
+    parser.add_argument("--sample", type=float, default=10.0, help="Seconds between two RSS samples.")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Minutes ignored in the slope.")
+    parser.add_argument("--max-slope", type=float, default=1.0, help="Largest RSS growth accepted, in MiB/hour.")
+    args = parser.parse_args()
+
+    subject = cv2.imread(args.image) if args.image else None
+    if subject is not None:
+        scale = min(args.width / 2 / subject.shape[1], args.height / subject.shape[0], 1.0)
+        subject = cv2.resize(subject, None, fx=scale, fy=scale)
+
+    duration = args.hours * 3600
+    source = GeneratorSource(synthetic_frames(args.width, args.height, subject), length=sys.maxsize)
+    detectors = [FaceDetector(bounded_memory=True), FaceMeshDetector(bounded_memory=True),
+                 HandDetector(bounded_memory=True), PoseDetector(bounded_memory=True)]
+    face_detector, face_mesh_detector, hand_detector, pose_detector = detectors
+
+    samples = []
+    start = next_sample = time.perf_counter()
+    frames = 0
+    for _, frame in source.frames():
+        face_detector.find_faces(frame)
+        face_mesh_detector.findface_mesh(frame)
+        hand_detector.find_hands(frame)
+        pose_detector.find_position(frame, results=pose_detector.process(frame))
+        frames += 1
+
+        now = time.perf_counter()
+        if now >= next_sample:
+            samples.append((now - start, rss_mib()))
+            print(f"{(now - start) / 60:7.1f} min  {frames:>8} frames  RSS {samples[-1][1]:8.1f} MiB", flush=True)
+            next_sample += args.sample
+        if now - start >= duration:
+            break
+
+    source.close()
+    for detector in detectors:
+        detector.close()
+
+    measured = [(elapsed, rss) for elapsed, rss in samples if elapsed >= args.warmup * 60]
+    if len(measured) < 2:
+        print("Not enough samples after the warmup, run longer or sample more often")
+        sys.exit(1)
+    elapsed, rss = np.array(measured).T
+    slope = np.polyfit(elapsed / 3600, rss, 1)[0]
+    print(f"{frames} frames in {(time.perf_counter() - start) / 3600:.2f} h, RSS {rss[0]:.1f} -> {rss[-1]:.1f} MiB, "
+          f"leak slope {slope:+.2f} MiB/hour (limit {args.max_slope:.2f})")
+    if slope > args.max_slope:
+        print("RSS keeps growing")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
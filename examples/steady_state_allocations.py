@@ -0,0 +1,64 @@
+"""
+Checks that the per-frame hot paths reuse their buffers once the frame shape is stable.
+Each frame may allocate at most ALLOCATION_BUDGET bytes, far less than a single frame.
+"""
+import sys
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from sightvision.module.face_mesh import FaceMeshDetector
+from sightvision.module.hand_tracking import HandDetector
+from sightvision.module.pose_estimation import PoseDetector
+from sightvision.utils.basics import find_contours, overlayPNG, stack_images
+
+WIDTH, HEIGHT = 3840, 2160
+WARMUP_FRAMES = 5
+FRAMES = 20
+ALLOCATION_BUDGET = 256 * 1024
+
+
+def main():
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+    mask = np.zeros((HEIGHT, WIDTH), np.uint8)
+    cv2.rectangle(mask, (200, 200), (900, 700), 255, cv2.FILLED)
+    cv2.circle(mask, (2000, 1200), 300, 255, cv2.FILLED)
+    logo = rng.integers(0, 255, (200, 200, 4), dtype=np.uint8)
+
+    face_detector = FaceMeshDetector()
+    hand_detector = HandDetector()
+    pose_detector = PoseDetector()
+    buffers = {}
+
+    def run_frame():
+        face_detector.findface_mesh(frame, draw=False)
+        hand_detector.find_hands(frame, draw=False)
+        pose_detector.find_position(frame, draw=False, results=pose_detector.process(frame))
+        buffers["contours"], _ = find_contours(frame, mask, drawCon=False, out=buffers.get("contours"))
+        buffers["overlay"] = overlayPNG(frame, logo, [100, 100], out=buffers.get("overlay"))
+        buffers["stack"] = stack_images([frame, frame], 2, 0.25, out=buffers.get("stack"))
+
+    for _ in range(WARMUP_FRAMES):
+        run_frame()
+
+    tracemalloc.start()
+    worst = 0
+    for _ in range(FRAMES):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        run_frame()
+        _, peak = tracemalloc.get_traced_memory()
+        worst = max(worst, peak - before)
+    tracemalloc.stop()
+
+    print(f"Worst allocation per frame: {worst / 1024:.1f} KiB (budget {ALLOCATION_BUDGET / 1024:.0f} KiB, "
+          f"one frame is {frame.nbytes / 1024:.0f} KiB)")
+    if worst > ALLOCATION_BUDGET:
+        print("Allocation budget exceeded")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
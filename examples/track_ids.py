@@ -0,0 +1,39 @@
+import cv2
+from sightvision.module.face_detection import FaceDetector
+
+
+def describe_face(img, bbox):
+    # Stands for slow per-person work such as recognition or attribute estimation
+    x, y, w, h = bbox
+    face = img[max(y, 0):y + h, max(x, 0):x + w]
+    return f"{int(face.mean()) if face.size else 0} avg"
+
+
+def main():
+    cap = cv2.VideoCapture(0)
+    detector = FaceDetector(track_ids=True)
+    cache = {}
+
+    while True:
+        success, img = cap.read()
+        img, faces = detector.find_faces(img)
+
+        # The slow work runs once per person instead of once per frame
+        for face in faces:
+            track_id = face["track_id"]
+            if track_id not in cache:
+                cache[track_id] = describe_face(img, face["bbox"])
+            x, y, _, _ = face["bbox"]
+            cv2.putText(img, f"#{track_id} {cache[track_id]}", (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5,
+                        (0, 255, 0), 1)
+
+        # People who left the frame
+        for track_id in detector.tracker.expired:
+            cache.pop(track_id, None)
+
+        cv2.imshow("Image", img)
+        cv2.waitKey(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import sys
+
+import cv2
+from sightvision.io.video_source import FileVideoSource
+from sightvision.module.hand_tracking import HandDetector
+
+
+def main():
+    # The keyframe index is built on the first run and saved next to the video
+    source = FileVideoSource(sys.argv[1])
+    detector = HandDetector(detection_confidence=0.8, max_hands=2)
+
+    # Jump straight to the second minute, frames are decoded ahead while the detector runs
+    start = source.index_at(60.0)
+    stop = source.index_at(120.0)
+    for index, img, hands in source.map(lambda frame: detector.find_hands(frame, draw=False), start, stop):
+        for hand in hands:
+            print(f"{source.timestamp(index):.3f}s {hand['type']} {detector.fingersUp(hand)}")
+        cv2.imshow("Image", img)
+        cv2.waitKey(1)
+
+    source.close()
+
+
+if __name__ == "__main__":
+    main()
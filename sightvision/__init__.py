@@ -4,10 +4,25 @@ from sightvision.module.face_detection import FaceDetector
 from sightvision.module.face_mesh import FaceMeshDetector
 from sightvision.module.hand_tracking import HandDetector
 from sightvision.module.pose_estimation import PoseDetector
+from sightvision.module.multi_pose_estimation import MultiPoseDetector
 
 from sightvision.utils.basics import stack_images, rounded_rectangle, find_contours
+from sightvision.utils.hit_test import HitTestIndex, fingertip_points
+from sightvision.utils.pose_library import PoseLibrary, normalize_pose
+from sightvision.utils.tracker import BoxTracker, iou_matrix
+from sightvision.utils.rendering import LandmarkRenderer, HAND_EDGES, POSE_EDGES, FACE_MESH_EDGES
+
+from sightvision.common.executor import DetectorExecutor
+from sightvision.common.quality import QualityController
+from sightvision.io.video_source import VideoSource, FileVideoSource, ImageDirectorySource, GeneratorSource
+from sightvision.io.video_writer import AsyncFrameWriter, VideoFileWriter, MJPEGServer
+from sightvision.io.wire import ResultEncoder, ResultDecoder, ResultPublisher, ResultSubscriber
 
 __all__ = [
-    'FaceDetector', 'FaceMeshDetector', 'HandDetector', 'PoseDetector', 'stack_images', 'rounded_rectangle',
-    'find_contours'
+    'FaceDetector', 'FaceMeshDetector', 'HandDetector', 'PoseDetector', 'MultiPoseDetector', 'stack_images',
+    'rounded_rectangle', 'find_contours', 'HitTestIndex', 'fingertip_points', 'PoseLibrary', 'normalize_pose',
+    'BoxTracker', 'iou_matrix', 'LandmarkRenderer', 'HAND_EDGES', 'POSE_EDGES', 'FACE_MESH_EDGES',
+    'DetectorExecutor', 'QualityController', 'VideoSource', 'FileVideoSource', 'ImageDirectorySource',
+    'GeneratorSource', 'AsyncFrameWriter', 'VideoFileWriter', 'MJPEGServer', 'ResultEncoder', 'ResultDecoder',
+    'ResultPublisher', 'ResultSubscriber'
 ]
@@ -0,0 +1,72 @@
+"""
+Detector Executor Module
+Copyright (c) 2022 Leonardi Melo
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from typing import Any, Callable, Dict, Optional
+
+
+class DetectorExecutor:
+    """
+    Runs several detectors on the same frame at once using a thread pool.
+
+    Mediapipe runs its graphs natively, so detectors submitted together
+    (e.g. face, hands and pose) spread across cores. Each task receives the
+    same frame, so tasks should not draw on it; pass `draw=False` and draw
+    on the frame once all the results are back.
+
+    Example:
+        with DetectorExecutor() as executor:
+            results = executor.run(frame, {
+                "hands": lambda f: hand_detector.find_hands(f, draw=False),
+                "faces": lambda f: face_mesh_detector.findface_mesh(f, draw=False)[1],
+            })
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        """
+        Args:
+            max_workers: Number of worker threads. Defaults to the
+                ThreadPoolExecutor default, which scales with the number of cores.
+        """
+        self.max_workers = max_workers
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sightvision")
+
+    def submit(self, frame, tasks: Dict[str, Callable[[Any], Any]]):
+        """
+        Starts every task on the frame without waiting for the results.
+
+        Args:
+            frame (numpy.ndarray): The input frame in BGR format.
+            tasks (dict): Name of each task mapped to a callable taking the frame.
+        Returns:
+            dict: Name of each task mapped to its future.
+        """
+        return {name: self.pool.submit(task, frame) for name, task in tasks.items()}
+
+    def run(self, frame, tasks: Dict[str, Callable[[Any], Any]], timeout: Optional[float] = None):
+        """
+        Runs every task on the frame and waits for all of them.
+
+        Args:
+            frame (numpy.ndarray): The input frame in BGR format.
+            tasks (dict): Name of each task mapped to a callable taking the frame.
+            timeout (float, optional): Seconds to wait for each result.
+        Returns:
+            dict: Name of each task mapped to what the task returned.
+        """
+        futures = self.submit(frame, tasks)
+        return {name: future.result(timeout=timeout) for name, future in futures.items()}
+
+    def close(self):
+        """
+        Waits for the running tasks and stops the worker threads.
+        """
+        self.pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,229 @@
+"""
+Quality Controller Module
+Copyright (c) 2022 Leonardi Melo
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from typing import Any, Dict, List, Optional
+
+from sightvision.module.face_detection import FaceDetector
+from sightvision.module.face_mesh import FaceMeshDetector
+from sightvision.module.hand_tracking import HandDetector
+from sightvision.module.pose_estimation import PoseDetector
+
+
+class QualityController:
+    """
+    Keeps the detectors within a per-frame latency budget.
+
+    The controller walks a ladder of quality levels, level 0 being the best
+    quality. Each level maps detectors to the settings passed to their
+    `reconfigure` method (model complexity, inference resolution, maximum
+    number of hands/faces, static or tracking mode). It measures a rolling
+    latency and steps down the ladder when the budget is exceeded and back
+    up when there is room left.
+
+    Oscillation is avoided by hysteresis: the latency has to cross different
+    thresholds to degrade and to upgrade, a full window has to be measured
+    at the current level before the next change, and an upgrade that had to
+    be undone right away makes the next upgrade wait twice as long.
+    """
+
+    def __init__(self,
+                 levels: List[Dict[Any, Dict[str, Any]]],
+                 budget_ms=33.0,
+                 window=30,
+                 percentile=0.9,
+                 degrade_at=1.0,
+                 upgrade_at=0.7,
+                 cooldown=30,
+                 max_backoff=32,
+                 level=0):
+        """
+        Args:
+            levels: Settings per detector for each level, from best to fastest.
+            budget_ms: Latency budget of a frame in milliseconds.
+            window: Number of frames in the rolling latency.
+            percentile: Percentile of the window compared with the budget.
+            degrade_at: Step down when the latency is above this fraction of the budget.
+            upgrade_at: Step up when the latency is below this fraction of the budget.
+            cooldown: Minimum number of frames between two changes.
+            max_backoff: Maximum factor applied to the cooldown before an upgrade.
+            level: Level to start at.
+        """
+        if not levels:
+            raise ValueError("At least one quality level is required")
+
+        self.levels = levels
+        self.budget_ms = budget_ms
+        self.percentile = percentile
+        self.degrade_at = degrade_at
+        self.upgrade_at = upgrade_at
+        self.cooldown = cooldown
+        self.max_backoff = max_backoff
+
+        self.latencies = deque(maxlen=window)
+        self.level = level
+        self.frames_since_change = 0
+        self.changes = 0
+        self.upgrade_backoff = 1
+        self._last_change = None
+        self._lock = threading.Lock()
+
+        self._apply(level)
+
+    @staticmethod
+    def default_levels(pose: Optional[PoseDetector] = None,
+                       hands: Optional[HandDetector] = None,
+                       face_mesh: Optional[FaceMeshDetector] = None,
+                       face: Optional[FaceDetector] = None,
+                       scales=(1.0, 0.75, 0.5)):
+        """
+        Builds a ladder that starts from the current settings of the detectors.
+
+        Going down, the detectors first switch to tracking mode, then the pose
+        model gets lighter, then the inference resolution drops, and finally
+        only one hand and one face are followed.
+
+        Args:
+            pose, hands, face_mesh, face: Detectors to control.
+            scales: Inference resolutions used along the ladder, best first.
+        Returns:
+            list: The levels, to be passed to QualityController.
+        """
+
+        def level(scale, complexity, tracking, single):
+            settings = {}
+            if pose is not None:
+                settings[pose] = {
+                    "mode": False if tracking else pose.mode,
+                    "model_complexity": complexity,
+                    "inference_scale": scale,
+                }
+            if hands is not None:
+                settings[hands] = {
+                    "mode": False if tracking else hands.mode,
+                    "max_hands": min(hands.max_hands, 1) if single else hands.max_hands,
+                    "inference_scale": scale,
+                }
+            if face_mesh is not None:
+                settings[face_mesh] = {
+                    "static_mode": False if tracking else face_mesh.staticMode,
+                    "max_faces": min(face_mesh.max_faces, 1) if single else face_mesh.max_faces,
+                    "inference_scale": scale,
+                }
+            if face is not None:
+                settings[face] = {"inference_scale": scale}
+            return settings
+
+        complexity = pose.model_complexity if pose is not None else 0
+        levels = [level(scales[0], complexity, False, False), level(scales[0], complexity, True, False)]
+        for lighter in range(complexity - 1, -1, -1):
+            levels.append(level(scales[0], lighter, True, False))
+        for scale in scales[1:]:
+            levels.append(level(scale, 0, True, False))
+        levels.append(level(scales[-1], 0, True, True))
+
+        # Detectors already in tracking mode make some steps identical
+        unique = [levels[0]]
+        for settings in levels[1:]:
+            if settings != unique[-1]:
+                unique.append(settings)
+        return unique
+
+    @property
+    def latency_ms(self) -> Optional[float]:
+        """
+        Rolling latency of the current level, None until a frame is measured.
+        """
+        with self._lock:
+            return self._latency()
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        """
+        Current level, its settings and the latency it is measured at.
+        """
+        with self._lock:
+            return {
+                "level": self.level,
+                "levels": len(self.levels),
+                "settings": {type(detector).__name__: dict(settings)
+                             for detector, settings in self.levels[self.level].items()},
+                "latency_ms": self._latency(),
+                "budget_ms": self.budget_ms,
+                "frames_since_change": self.frames_since_change,
+                "changes": self.changes,
+                "upgrade_backoff": self.upgrade_backoff,
+            }
+
+    def record(self, latency_ms: float):
+        """
+        Adds the latency of a frame and changes level when needed.
+        Args:
+            latency_ms (float): Time spent on the frame in milliseconds.
+        """
+        with self._lock:
+            self.latencies.append(latency_ms)
+            self.frames_since_change += 1
+
+            # Only judge a level once a full window was measured with it
+            if len(self.latencies) < self.latencies.maxlen or self.frames_since_change < self.cooldown:
+                return
+
+            latency = self._latency()
+            if latency > self.budget_ms * self.degrade_at and self.level < len(self.levels) - 1:
+                if self._last_change == "upgrade":
+                    self.upgrade_backoff = min(self.upgrade_backoff * 2, self.max_backoff)
+                self._change(self.level + 1, "degrade")
+            elif latency < self.budget_ms * self.upgrade_at and self.level > 0 and \
+                    self.frames_since_change >= self.cooldown * self.upgrade_backoff:
+                if self._last_change == "upgrade":
+                    self.upgrade_backoff = max(self.upgrade_backoff // 2, 1)
+                self._change(self.level - 1, "upgrade")
+
+    @contextmanager
+    def measure(self):
+        """
+        Measures the latency of the code run inside the block.
+
+        Example:
+            with controller.measure():
+                hands = detector.find_hands(img, draw=False)
+        """
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.record((time.perf_counter() - start) * 1000)
+
+    def run(self, function, *args, **kwargs):
+        """
+        Calls the function and records how long it took.
+        Returns:
+            What the function returned.
+        """
+        with self.measure():
+            return function(*args, **kwargs)
+
+    def _latency(self):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(len(ordered) * self.percentile), len(ordered) - 1)]
+
+    def _change(self, level, direction):
+        self._apply(level)
+        self.level = level
+        self.changes += 1
+        self._last_change = direction
+
+    def _apply(self, level):
+        for detector, settings in self.levels[level].items():
+            detector.reconfigure(**settings)
+        # Latencies measured with the previous settings no longer apply
+        self.latencies.clear()
+        self.frames_since_change = 0
@@ -0,0 +1,420 @@
+"""
+Video Source Module
+Copyright (c) 2022 Leonardi Melo
+"""
+import bisect
+import json
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple
+
+_INDEX_VERSION = 1
+_INDEX_SUFFIX = ".svindex.json"
+_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+
+class VideoSource:
+    """
+    Random access source of BGR frames for offline analysis.
+
+    Frames can be read one at a time, as a range, or iterated with decoding
+    done ahead on background threads while the caller runs inference.
+    Subclasses implement `__len__` and `_read_frames`.
+    """
+
+    def __init__(self, fps=30.0):
+        self.fps = fps
+        self._lock = threading.Lock()
+        self._reader = None
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def timestamp(self, index: int) -> float:
+        """
+        Returns the presentation time of a frame in seconds.
+        """
+        return self._check_index(index) / self.fps
+
+    def index_at(self, seconds: float) -> int:
+        """
+        Returns the index of the frame shown at the given time in seconds.
+        """
+        return min(max(int(seconds * self.fps), 0), len(self) - 1)
+
+    def read(self, index: int):
+        """
+        Reads a single frame.
+
+        Args:
+            index (int): Index of the frame. Negative values count from the end.
+        Returns:
+            numpy.ndarray: The frame in BGR format.
+        """
+        index = self._check_index(index)
+        return self.read_range(index, index + 1)[0]
+
+    def read_range(self, start: int, stop: int) -> List[Any]:
+        """
+        Reads the frames in [start, stop).
+
+        Args:
+            start (int): Index of the first frame.
+            stop (int): Index after the last frame.
+        Returns:
+            list: The frames in BGR format.
+        """
+        start, stop = self._check_range(start, stop)
+        with self._lock:
+            if self._reader is None:
+                self._reader = self._open_reader()
+            return self._read_frames(self._reader, start, stop)
+
+    def frames(self,
+               start: int = 0,
+               stop: Optional[int] = None,
+               prefetch: int = 4,
+               workers: int = 1,
+               chunk_size: int = 16) -> Iterator[Tuple[int, Any]]:
+        """
+        Iterates over the frames while decoding ahead on background threads.
+
+        Args:
+            start (int, optional): Index of the first frame. Defaults to 0.
+            stop (int, optional): Index after the last frame. Defaults to the end.
+            prefetch (int, optional): Number of chunks decoded ahead. Defaults to 4.
+            workers (int, optional): Number of decoding threads. Defaults to 1.
+            chunk_size (int, optional): Frames decoded by a thread in one go. Defaults to 16.
+        Yields:
+            tuple: The frame index and the frame in BGR format, in order.
+        """
+        start, stop = self._check_range(start, stop)
+        # Chunks are produced lazily, so very long sources cost nothing up front
+        chunks = ((chunk_start, min(chunk_start + chunk_size, stop))
+                  for chunk_start in range(start, stop, chunk_size))
+
+        # Every decoding thread keeps its own reader, so seeks never interleave
+        local = threading.local()
+        readers = []
+        readers_lock = threading.Lock()
+
+        def read_chunk(chunk_start, chunk_stop):
+            reader = getattr(local, "reader", None)
+            if reader is None:
+                reader = local.reader = self._open_reader()
+                with readers_lock:
+                    readers.append(reader)
+            return self._read_frames(reader, chunk_start, chunk_stop)
+
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sightvision-decode")
+        pending = deque()
+        try:
+            for chunk in chunks:
+                pending.append((chunk[0], pool.submit(read_chunk, *chunk)))
+                if len(pending) >= max(prefetch, 1):
+                    break
+
+            while pending:
+                chunk_start, future = pending.popleft()
+                chunk_frames = future.result()
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    pending.append((chunk[0], pool.submit(read_chunk, *chunk)))
+                for offset, frame in enumerate(chunk_frames):
+                    yield chunk_start + offset, frame
+        finally:
+            for _, future in pending:
+                future.cancel()
+            pool.shutdown(wait=True)
+            for reader in readers:
+                self._close_reader(reader)
+
+    def map(self, function: Callable[[Any], Any], start: int = 0, stop: Optional[int] = None,
+            **kwargs) -> Iterator[Tuple[int, Any, Any]]:
+        """
+        Runs a detector on every frame while the next frames are decoded.
+
+        Example:
+            for index, frame, hands in source.map(lambda f: detector.find_hands(f, draw=False)):
+                ...
+
+        Args:
+            function (callable): Called with each frame, e.g. a detector method.
+            start (int, optional): Index of the first frame. Defaults to 0.
+            stop (int, optional): Index after the last frame. Defaults to the end.
+            **kwargs: Prefetching options passed to `frames`.
+        Yields:
+            tuple: The frame index, the frame and what the function returned.
+        """
+        for index, frame in self.frames(start, stop, **kwargs):
+            yield index, frame, function(frame)
+
+    def __iter__(self):
+        for _, frame in self.frames():
+            yield frame
+
+    def close(self):
+        """
+        Releases the reader used by `read` and `read_range`.
+        """
+        with self._lock:
+            if self._reader is not None:
+                self._close_reader(self._reader)
+                self._reader = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _open_reader(self):
+        return None
+
+    def _close_reader(self, reader):
+        pass
+
+    def _read_frames(self, reader, start: int, stop: int) -> List[Any]:
+        raise NotImplementedError
+
+    def _check_index(self, index: int) -> int:
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError(f"Frame {index} is out of range for a source of {length} frames")
+        return index
+
+    def _check_range(self, start: int, stop: Optional[int]) -> Tuple[int, int]:
+        length = len(self)
+        stop = length if stop is None else stop
+        if start < 0:
+            start += length
+        if stop < 0:
+            stop += length
+        if not 0 <= start <= stop <= length:
+            raise IndexError(f"Range [{start}, {stop}) is out of range for a source of {length} frames")
+        return start, stop
+
+
+class FileVideoSource(VideoSource):
+    """
+    Video file with a persisted keyframe/timestamp index for frame accurate seeks.
+
+    The index is built once by scanning the packets of the file without
+    decoding them, and saved next to the file as `<file>.svindex.json`.
+    Seeks jump to the closest keyframe before the target and decode forward.
+    """
+
+    def __init__(self, path: str, index_path: Optional[str] = None, max_grab_ahead: int = 64,
+                 seek_interval: int = 30):
+        """
+        Args:
+            path (str): Path to the video file.
+            index_path (str, optional): Where to keep the index. Defaults to the file path
+                followed by `.svindex.json`.
+            max_grab_ahead (int, optional): Targets closer than this many frames ahead are
+                reached by decoding forward instead of seeking. Defaults to 64.
+            seek_interval (int, optional): Spacing of seek points when the backend does
+                not report keyframes. Defaults to 30.
+        """
+        if not os.path.isfile(path):
+            raise FileNotFoundError(path)
+
+        self.path = path
+        self.index_path = index_path or path + _INDEX_SUFFIX
+        self.max_grab_ahead = max_grab_ahead
+        self.seek_interval = seek_interval
+
+        index = self._load_index()
+        if index is None:
+            index = self._build_index()
+            self._save_index(index)
+
+        super().__init__(fps=index["fps"])
+        self.width = index["width"]
+        self.height = index["height"]
+        self.timestamps = index["timestamps"]
+        self.keyframes = index["keyframes"] or [0]
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def timestamp(self, index: int) -> float:
+        return self.timestamps[self._check_index(index)] / 1000
+
+    def index_at(self, seconds: float) -> int:
+        index = bisect.bisect_right(self.timestamps, seconds * 1000) - 1
+        return min(max(index, 0), len(self) - 1)
+
+    def _file_signature(self):
+        stat = os.stat(self.path)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, encoding="utf8") as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            return None
+
+        if index.get("version") != _INDEX_VERSION or index.get("file") != self._file_signature():
+            return None
+        return index
+
+    def _save_index(self, index):
+        try:
+            with open(self.index_path, "w", encoding="utf8") as index_file:
+                json.dump(index, index_file)
+        except OSError:
+            # Read-only media, the index is simply rebuilt next time
+            pass
+
+    def _build_index(self):
+        capture = cv2.VideoCapture(self.path)
+        if not capture.isOpened():
+            raise IOError(f"Could not open the video {self.path}")
+
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+        # Raw mode reads the packets without decoding them and reports keyframes
+        raw = capture.set(cv2.CAP_PROP_FORMAT, -1)
+        packets = []
+        while capture.grab():
+            is_key = raw and bool(capture.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME))
+            packets.append((capture.get(cv2.CAP_PROP_POS_MSEC), is_key))
+        capture.release()
+
+        # Packets come in decoding order, frames are indexed in presentation order
+        timestamps = sorted(timestamp for timestamp, _ in packets)
+        if raw and any(is_key for _, is_key in packets):
+            keyframes = sorted(bisect.bisect_left(timestamps, timestamp) for timestamp, is_key in packets if is_key)
+        else:
+            keyframes = list(range(0, len(timestamps), self.seek_interval))
+
+        return {
+            "version": _INDEX_VERSION,
+            "file": self._file_signature(),
+            "fps": fps,
+            "width": width,
+            "height": height,
+            "timestamps": timestamps,
+            "keyframes": keyframes,
+        }
+
+    def _open_reader(self):
+        return _CaptureReader(self)
+
+    def _close_reader(self, reader):
+        reader.capture.release()
+
+    def _read_frames(self, reader, start, stop):
+        frames = []
+        for index in range(start, stop):
+            reader.grab_to(index)
+            success, frame = reader.capture.retrieve()
+            if not success:
+                raise IOError(f"Could not decode frame {index} of {self.path}")
+            frames.append(frame)
+        return frames
+
+
+class _CaptureReader:
+    """
+    Decoder of a FileVideoSource that keeps track of the last grabbed frame.
+    """
+
+    def __init__(self, source: FileVideoSource):
+        self.source = source
+        self.capture = cv2.VideoCapture(source.path)
+        self.position = -1
+        # Timestamps closer than half a frame are considered the same frame
+        self.tolerance = 500 / (source.fps or 30.0)
+
+    def grab_to(self, index: int):
+        if not self.position < index <= self.position + self.source.max_grab_ahead:
+            self._seek(index)
+
+        while self.position < index:
+            if not self.capture.grab():
+                raise IOError(f"Could not decode frame {self.position + 1} of {self.source.path}")
+            self.position += 1
+
+    def _seek(self, index: int):
+        keyframes = self.source.keyframes
+        keyframe = keyframes[max(bisect.bisect_right(keyframes, index) - 1, 0)]
+        self.capture.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+        landed = self._locate(self.capture.get(cv2.CAP_PROP_POS_MSEC)) if self.capture.grab() else None
+        if landed is None or landed > index:
+            # The backend did not land where the index says, decode from the start instead
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self.position = -1
+        else:
+            self.position = landed
+
+    def _locate(self, milliseconds: float) -> Optional[int]:
+        timestamps = self.source.timestamps
+        index = bisect.bisect_left(timestamps, milliseconds - self.tolerance)
+        if index < len(timestamps) and abs(timestamps[index] - milliseconds) <= self.tolerance:
+            return index
+        return None
+
+
+class ImageDirectorySource(VideoSource):
+    """
+    Directory of images read in file name order.
+    """
+
+    def __init__(self, path: str, fps=30.0, extensions: Sequence[str] = _IMAGE_EXTENSIONS):
+        """
+        Args:
+            path (str): Directory with the images.
+            fps (float, optional): Frame rate used for the timestamps. Defaults to 30.
+            extensions (list, optional): File extensions treated as images.
+        """
+        super().__init__(fps=fps)
+        self.path = path
+        self.files = sorted(
+            os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(tuple(extensions)))
+
+    def __len__(self):
+        return len(self.files)
+
+    def _read_frames(self, reader, start, stop):
+        frames = []
+        for file in self.files[start:stop]:
+            frame = cv2.imread(file)
+            if frame is None:
+                raise IOError(f"Could not read the image {file}")
+            frames.append(frame)
+        return frames
+
+
+class GeneratorSource(VideoSource):
+    """
+    Synthetic frames produced by a function of the frame index.
+    """
+
+    def __init__(self, generator: Callable[[int], Any], length: int, fps=30.0):
+        """
+        Args:
+            generator (callable): Returns the BGR frame for a given index.
+            length (int): Number of frames.
+            fps (float, optional): Frame rate used for the timestamps. Defaults to 30.
+        """
+        super().__init__(fps=fps)
+        self.generator = generator
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def _read_frames(self, reader, start, stop):
+        return [self.generator(index) for index in range(start, stop)]
@@ -0,0 +1,361 @@
+"""
+Video Writer Module
+Copyright (c) 2022 Leonardi Melo
+"""
+import queue
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+from typing import Any, Dict, Optional, Tuple
+
+DROP_POLICIES = ("block", "drop_newest", "drop_oldest")
+
+
+class AsyncFrameWriter:
+    """
+    Output stage that encodes annotated frames on worker threads.
+
+    Frames go through a bounded queue, are encoded in parallel by the
+    workers and are emitted in the order they were written. When the queue
+    is full the drop policy decides what happens:
+
+    - "block": `write` waits for room in the queue.
+    - "drop_newest": the frame being written is dropped.
+    - "drop_oldest": the oldest queued frame is dropped to make room.
+
+    Subclasses implement `_encode`, which runs on any worker, and `_emit`,
+    which is called with the encoded frames one at a time, in order.
+    """
+
+    def __init__(self, workers=1, queue_size=32, drop_policy="block", metrics_window=120):
+        """
+        Args:
+            workers (int, optional): Number of encoding threads. Defaults to 1.
+            queue_size (int, optional): Maximum number of frames waiting to be encoded. Defaults to 32.
+            drop_policy (str, optional): "block", "drop_newest" or "drop_oldest". Defaults to "block".
+            metrics_window (int, optional): Number of frames in the latency metrics. Defaults to 120.
+        """
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy {drop_policy!r}, please select one of {DROP_POLICIES}")
+
+        self.drop_policy = drop_policy
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.encode_times = deque(maxlen=metrics_window)
+        self.latencies = deque(maxlen=metrics_window)
+
+        self._take_lock = threading.Lock()
+        self._emit_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._next_sequence = 0
+        self._next_emit = 0
+        self._encoded = {}
+        self._error = None
+        self._closed = False
+
+        self.workers = [
+            threading.Thread(target=self._work, name=f"sightvision-encode-{index}", daemon=True)
+            for index in range(workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def write(self, frame, copy=True) -> bool:
+        """
+        Queues a frame for encoding.
+
+        Args:
+            frame (numpy.ndarray): The annotated frame in BGR format.
+            copy (bool, optional): Copy the frame so the caller can keep drawing on
+                or reusing its buffer. Defaults to True.
+        Returns:
+            bool: False if the frame was dropped.
+        """
+        self._raise_error()
+        if self._closed:
+            raise RuntimeError("The writer is closed")
+
+        item = (frame.copy() if copy else frame, time.perf_counter())
+        if self.drop_policy == "block":
+            self.queue.put(item)
+            return True
+
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return True
+            except queue.Full:
+                if self.drop_policy == "drop_newest":
+                    self._count_drop()
+                    return False
+            try:
+                self.queue.get_nowait()
+                self._count_drop()
+            except queue.Empty:
+                pass
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Frames written and dropped, queue depth, and the average and worst
+        encode time and end to end latency in milliseconds.
+        """
+        with self._metrics_lock:
+            encode_times = list(self.encode_times)
+            latencies = list(self.latencies)
+            return {
+                "frames_written": self.frames_written,
+                "frames_dropped": self.frames_dropped,
+                "queued": self.queue.qsize(),
+                "encode_ms": sum(encode_times) / len(encode_times) if encode_times else None,
+                "encode_max_ms": max(encode_times) if encode_times else None,
+                "latency_ms": sum(latencies) / len(latencies) if latencies else None,
+                "latency_max_ms": max(latencies) if latencies else None,
+            }
+
+    def close(self):
+        """
+        Encodes the frames still queued and stops the workers.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self.workers:
+            self.queue.put(None)
+        for worker in self.workers:
+            worker.join()
+        self._release()
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _encode(self, frame):
+        return frame
+
+    def _emit(self, encoded):
+        raise NotImplementedError
+
+    def _release(self):
+        pass
+
+    def _count_drop(self):
+        with self._metrics_lock:
+            self.frames_dropped += 1
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _work(self):
+        while True:
+            # Sequence numbers are taken in queue order, so dropped frames leave no gap
+            with self._take_lock:
+                item = self.queue.get()
+                if item is None:
+                    return
+                sequence = self._next_sequence
+                self._next_sequence += 1
+
+            frame, queued_at = item
+            started = time.perf_counter()
+            try:
+                encoded = self._encode(frame)
+            except Exception as error:
+                self._error = error
+                encoded = None
+            encode_time = (time.perf_counter() - started) * 1000
+
+            with self._emit_lock:
+                self._encoded[sequence] = (encoded, queued_at, encode_time)
+                while self._next_emit in self._encoded:
+                    encoded, queued_at, encode_time = self._encoded.pop(self._next_emit)
+                    self._next_emit += 1
+                    if encoded is None:
+                        continue
+                    started = time.perf_counter()
+                    try:
+                        self._emit(encoded)
+                    except Exception as error:
+                        self._error = error
+                        continue
+                    # Some outputs (e.g. cv2.VideoWriter) encode while emitting
+                    encode_time += (time.perf_counter() - started) * 1000
+                    with self._metrics_lock:
+                        self.frames_written += 1
+                        self.encode_times.append(encode_time)
+                        self.latencies.append((time.perf_counter() - queued_at) * 1000)
+
+
+class VideoFileWriter(AsyncFrameWriter):
+    """
+    Writes annotated frames to a video file from a background thread.
+    """
+
+    def __init__(self, path: str, fps=30.0, fourcc="mp4v", frame_size: Optional[Tuple[int, int]] = None,
+                 queue_size=64, drop_policy="block"):
+        """
+        Args:
+            path (str): Path of the video file.
+            fps (float, optional): Frame rate of the video. Defaults to 30.
+            fourcc (str, optional): Codec of the video. Defaults to "mp4v".
+            frame_size (tuple, optional): (width, height) of the video. Defaults to the size of the first frame.
+            queue_size (int, optional): Maximum number of frames waiting to be written. Defaults to 64.
+            drop_policy (str, optional): "block", "drop_newest" or "drop_oldest". Defaults to "block".
+        """
+        self.path = path
+        self.fps = fps
+        self.fourcc = fourcc
+        self.frame_size = frame_size
+        self.video_writer = None
+        # cv2.VideoWriter encodes inside write(), which has to be called in order, so one worker
+        super().__init__(workers=1, queue_size=queue_size, drop_policy=drop_policy)
+
+    def _emit(self, frame):
+        if self.video_writer is None:
+            if self.frame_size is None:
+                self.frame_size = (frame.shape[1], frame.shape[0])
+            video_writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps,
+                                           self.frame_size)
+            # Only keep a writer that opened, so every frame fails until one does
+            if not video_writer.isOpened():
+                raise IOError(f"Could not open the video {self.path} for writing")
+            self.video_writer = video_writer
+
+        if (frame.shape[1], frame.shape[0]) != self.frame_size:
+            frame = cv2.resize(frame, self.frame_size)
+        self.video_writer.write(frame)
+
+    def _release(self):
+        if self.video_writer is not None:
+            self.video_writer.release()
+
+
+class MJPEGServer(AsyncFrameWriter):
+    """
+    Serves annotated frames as an MJPEG stream on a local HTTP endpoint.
+
+    The stream is available at `http://<host>:<port>/` and the latest frame
+    at `http://<host>:<port>/snapshot.jpg`. JPEG encoding runs on several
+    workers, and clients that are slower than the stream skip frames.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8080, quality=80, workers=2, queue_size=8,
+                 drop_policy="drop_oldest"):
+        """
+        Args:
+            host (str, optional): Address to listen on. Defaults to "127.0.0.1".
+            port (int, optional): Port to listen on, 0 picks a free one. Defaults to 8080.
+            quality (int, optional): JPEG quality from 0 to 100. Defaults to 80.
+            workers (int, optional): Number of encoding threads. Defaults to 2.
+            queue_size (int, optional): Maximum number of frames waiting to be encoded. Defaults to 8.
+            drop_policy (str, optional): "block", "drop_newest" or "drop_oldest". Defaults to "drop_oldest".
+        """
+        self.quality = quality
+        self.latest = None
+        self.latest_index = 0
+        self._frame_ready = threading.Condition()
+
+        # The writer state must exist before the first request can reach wait_frame
+        super().__init__(workers=workers, queue_size=queue_size, drop_policy=drop_policy)
+
+        self.server = None
+        try:
+            self.server = ThreadingHTTPServer((host, port), _MJPEGRequestHandler)
+        except OSError:
+            # e.g. the port is taken, stop the encoding workers already started
+            self.close()
+            raise
+        self.server.daemon_threads = True
+        self.server.stream = self
+        self.host, self.port = self.server.server_address[:2]
+        self.server_thread = threading.Thread(target=self.server.serve_forever, name="sightvision-mjpeg",
+                                              daemon=True)
+        self.server_thread.start()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/"
+
+    def wait_frame(self, after_index: int, timeout: Optional[float] = None):
+        """
+        Waits for a frame newer than the given index.
+        Returns:
+            tuple: The index and the JPEG bytes of the latest frame, or None on timeout or close.
+        """
+        with self._frame_ready:
+            self._frame_ready.wait_for(lambda: self.latest_index > after_index or self._closed, timeout)
+            if self.latest_index <= after_index:
+                return None
+            return self.latest_index, self.latest
+
+    def _encode(self, frame):
+        success, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not success:
+            raise IOError("Could not encode the frame as JPEG")
+        return jpeg.tobytes()
+
+    def _emit(self, jpeg):
+        with self._frame_ready:
+            self.latest = jpeg
+            self.latest_index += 1
+            self._frame_ready.notify_all()
+
+    def _release(self):
+        with self._frame_ready:
+            self._frame_ready.notify_all()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+class _MJPEGRequestHandler(BaseHTTPRequestHandler):
+    boundary = "sightvisionframe"
+
+    def do_GET(self):
+        stream = self.server.stream
+        if self.path.startswith("/snapshot"):
+            frame = stream.wait_frame(0, timeout=5)
+            if frame is None:
+                self.send_error(503, "No frame available yet")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(frame[1])))
+            self.end_headers()
+            self.wfile.write(frame[1])
+            return
+
+        self.send_response(200)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={self.boundary}")
+        self.end_headers()
+
+        index = 0
+        try:
+            while True:
+                frame = stream.wait_frame(index, timeout=1)
+                if frame is None:
+                    if stream._closed:
+                        return
+                    continue
+                index, jpeg = frame
+                self.wfile.write(f"--{self.boundary}\r\nContent-Type: image/jpeg\r\n"
+                                 f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                self.wfile.write(jpeg)
+                self.wfile.write(b"\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away
+            return
+
+    def log_message(self, format, *args):
+        pass
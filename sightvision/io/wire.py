@@ -0,0 +1,461 @@
+"""
+Wire Format Module
+Copyright (c) 2022 Leonardi Melo
+
+Compact binary format for detector results. A message is a fixed 24 byte
+header followed by the landmarks of every object, then optionally their
+bounding boxes and labels:
+
+    offset  size  field
+    0       2     magic b"SV"
+    2       1     version
+    3       1     kind (hands, pose, face mesh, faces)
+    4       1     flags (float16, delta, has bboxes, has labels)
+    5       1     dims per landmark (2 or 3)
+    6       2     number of objects
+    8       2     number of landmarks per object
+    10      4     frame index
+    14      8     timestamp in seconds
+    22      2     reserved
+    24      ...   landmarks, objects x landmarks x dims int16 or float16
+    ...     ...   bboxes, objects x 4 int16 (x, y, w, h)
+    ...     ...   labels, objects uint8
+
+Delta messages carry the landmarks minus those of the previous message.
+"""
+import os
+import queue
+import socket
+import stat
+import struct
+import threading
+
+import numpy as np
+
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+MAGIC = b"SV"
+VERSION = 1
+HEADER = struct.Struct("<2sBBBBHHIdH")
+
+KIND_GENERIC = 0
+KIND_HANDS = 1
+KIND_POSE = 2
+KIND_FACE_MESH = 3
+KIND_FACES = 4
+
+FLAG_FLOAT16 = 1
+FLAG_DELTA = 2
+FLAG_BBOXES = 4
+FLAG_LABELS = 8
+
+HAND_TYPES = ("Left", "Right")
+
+_LENGTH = struct.Struct("<I")
+
+
+class ResultEncoder:
+    """
+    Packs detector results into the binary wire format.
+
+    With delta encoding, a full (key) message is sent every `keyframe_interval`
+    messages or when the number of objects changes, and the other messages
+    only carry the difference with the previous one, which is mostly small
+    values that compress well further down the line.
+    """
+
+    def __init__(self, dtype="int16", delta=False, keyframe_interval=30):
+        """
+        Args:
+            dtype (str, optional): "int16" for pixel coordinates or "float16". Defaults to "int16".
+            delta (bool, optional): Encode landmarks against the previous message. Only
+                used with int16, where it is lossless. Defaults to False.
+            keyframe_interval (int, optional): Messages between two full messages. Defaults to 30.
+        """
+        if dtype not in ("int16", "float16"):
+            raise ValueError("The dtype must be 'int16' or 'float16'")
+
+        self.dtype = np.dtype(dtype).newbyteorder("<")
+        self.delta = delta and dtype == "int16"
+        self.keyframe_interval = keyframe_interval
+        self._previous = None
+        self._since_keyframe = 0
+
+    def encode(self,
+               landmarks,
+               bboxes=None,
+               labels=None,
+               kind=KIND_GENERIC,
+               frame_index=0,
+               timestamp=0.0) -> bytes:
+        """
+        Packs landmark arrays into a message.
+
+        Args:
+            landmarks: Array of shape (objects, landmarks, dims).
+            bboxes (optional): Array of shape (objects, 4) with x, y, w, h.
+            labels (optional): Array of shape (objects,) with values from 0 to 255.
+            kind (int, optional): What the landmarks are, e.g. KIND_HANDS.
+            frame_index (int, optional): Index of the frame.
+            timestamp (float, optional): Time of the frame in seconds.
+        Returns:
+            bytes: The message.
+        """
+        landmarks = np.asarray(landmarks)
+        if landmarks.ndim != 3:
+            raise ValueError("The landmarks must have the shape (objects, landmarks, dims)")
+        landmarks = landmarks.astype(self.dtype)
+        objects, count, dims = landmarks.shape
+
+        flags = FLAG_FLOAT16 if self.dtype.kind == "f" else 0
+        payload = landmarks
+        if self.delta:
+            if self._previous is not None and self._previous.shape == landmarks.shape and \
+                    self._since_keyframe < self.keyframe_interval:
+                payload = landmarks - self._previous
+                flags |= FLAG_DELTA
+                self._since_keyframe += 1
+            else:
+                self._since_keyframe = 1
+            self._previous = landmarks
+
+        parts = [None, payload.tobytes()]
+        if bboxes is not None:
+            flags |= FLAG_BBOXES
+            parts.append(np.asarray(bboxes, dtype="<i2").reshape(objects, 4).tobytes())
+        if labels is not None:
+            flags |= FLAG_LABELS
+            parts.append(np.asarray(labels, dtype=np.uint8).reshape(objects).tobytes())
+
+        parts[0] = HEADER.pack(MAGIC, VERSION, kind, flags, dims, objects, count, frame_index, timestamp, 0)
+        return b"".join(parts)
+
+    def encode_hands(self, hands: List[Dict[str, Any]], frame_index=0, timestamp=0.0) -> bytes:
+        """
+        Packs the hands returned by `HandDetector.find_hands`.
+        Labels are the index of the hand type in HAND_TYPES.
+        """
+        landmarks = np.array([hand["lmList"] for hand in hands], dtype=np.int32).reshape(len(hands), 21, 3)
+        bboxes = [hand["bbox"] for hand in hands]
+        labels = [HAND_TYPES.index(hand["type"]) for hand in hands]
+        return self.encode(landmarks, bboxes, labels, KIND_HANDS, frame_index, timestamp)
+
+    def encode_pose(self, lmList, bboxInfo, frame_index=0, timestamp=0.0) -> bytes:
+        """
+        Packs the landmarks and bounding box returned by `PoseDetector.find_position`.
+        """
+        if not lmList:
+            return self.encode(np.zeros((0, 33, 3)), np.zeros((0, 4)), None, KIND_POSE, frame_index, timestamp)
+        landmarks = np.array(lmList, dtype=np.int32)[:, 1:].reshape(1, -1, 3)
+        return self.encode(landmarks, [bboxInfo["bbox"]], None, KIND_POSE, frame_index, timestamp)
+
+    def encode_face_mesh(self, faces: List[List[List[int]]], frame_index=0, timestamp=0.0) -> bytes:
+        """
+        Packs the faces returned by `FaceMeshDetector.findface_mesh`.
+        """
+        if not faces:
+            return self.encode(np.zeros((0, 468, 2)), None, None, KIND_FACE_MESH, frame_index, timestamp)
+        landmarks = np.array(faces, dtype=np.int32).reshape(len(faces), -1, 2)
+        return self.encode(landmarks, None, None, KIND_FACE_MESH, frame_index, timestamp)
+
+    def encode_faces(self, bboxs: List[Dict[str, Any]], frame_index=0, timestamp=0.0) -> bytes:
+        """
+        Packs the bounding boxes returned by `FaceDetector.find_faces`, labels are the scores in percent.
+        """
+        landmarks = np.zeros((len(bboxs), 0, 2))
+        bboxes = [face["bbox"] for face in bboxs]
+        labels = [int(face["score"][0] * 100) for face in bboxs]
+        return self.encode(landmarks, bboxes, labels, KIND_FACES, frame_index, timestamp)
+
+
+def decode_header(message) -> Dict[str, Any]:
+    """
+    Reads the header of a message.
+    Returns:
+        dict: kind, flags, dims, objects, count (landmarks per object), frame_index and timestamp.
+    """
+    magic, version, kind, flags, dims, objects, count, frame_index, timestamp, _ = HEADER.unpack_from(message)
+    if magic != MAGIC:
+        raise ValueError("Not a SightVision message")
+    if version != VERSION:
+        raise ValueError(f"Unsupported message version {version}")
+    return {
+        "kind": kind,
+        "flags": flags,
+        "dims": dims,
+        "objects": objects,
+        "count": count,
+        "frame_index": frame_index,
+        "timestamp": timestamp,
+    }
+
+
+def decode(message) -> Dict[str, Any]:
+    """
+    Decodes a message without copying: the arrays are views on the message buffer.
+
+    Args:
+        message (bytes, bytearray or memoryview): The message.
+    Returns:
+        dict: The header fields plus "landmarks" (objects, landmarks, dims),
+        "bboxes" (objects, 4) and "labels" (objects,) arrays, None when absent.
+        For delta messages the landmarks are the differences, use ResultDecoder
+        to get absolute values.
+    """
+    header = decode_header(message)
+    objects, count, dims, flags = header["objects"], header["count"], header["dims"], header["flags"]
+
+    dtype = np.dtype("<f2" if flags & FLAG_FLOAT16 else "<i2")
+    offset = HEADER.size
+    landmarks = np.frombuffer(message, dtype, objects * count * dims, offset).reshape(objects, count, dims)
+    offset += landmarks.nbytes
+
+    bboxes = labels = None
+    if flags & FLAG_BBOXES:
+        bboxes = np.frombuffer(message, "<i2", objects * 4, offset).reshape(objects, 4)
+        offset += bboxes.nbytes
+    if flags & FLAG_LABELS:
+        labels = np.frombuffer(message, np.uint8, objects, offset)
+
+    header.update(landmarks=landmarks, bboxes=bboxes, labels=labels, delta=bool(flags & FLAG_DELTA))
+    return header
+
+
+class ResultDecoder:
+    """
+    Decodes a stream of messages, resolving delta messages against the previous one.
+
+    Key messages are returned as zero copy views. Delta messages are added to
+    an array owned by the decoder, which is updated in place by the next one.
+    """
+
+    def __init__(self):
+        self._previous = None
+
+    def decode(self, message) -> Dict[str, Any]:
+        result = decode(message)
+        if result["delta"]:
+            if self._previous is None or self._previous.shape != result["landmarks"].shape:
+                raise ValueError("Delta message without the message it is based on")
+            np.add(self._previous, result["landmarks"], out=self._previous)
+            result["landmarks"] = self._previous
+        elif result["flags"] & FLAG_FLOAT16 == 0:
+            # Keep a private copy only when the stream may continue with deltas
+            self._previous = result["landmarks"].copy()
+        return result
+
+
+def _create_socket(address: Union[str, Tuple[str, int]]):
+    if isinstance(address, str):
+        return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    return socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+
+def _file_id(path):
+    """
+    Device and inode of a socket file, None when there is no socket at the path.
+    """
+    try:
+        info = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (info.st_dev, info.st_ino) if stat.S_ISSOCK(info.st_mode) else None
+
+
+class ResultPublisher:
+    """
+    Sends encoded messages to every connected subscriber over a Unix or TCP socket.
+
+    Every subscriber has its own bounded queue and sender thread, so a slow
+    subscriber drops its own messages without slowing down the others. After
+    a drop, or when it just connected, a subscriber skips delta messages
+    until the next key message.
+    """
+
+    def __init__(self, address: Union[str, Tuple[str, int]] = ("127.0.0.1", 5555), queue_size=64):
+        """
+        Args:
+            address: Path of a Unix socket, or (host, port) for TCP. Port 0 picks a free one.
+            queue_size (int, optional): Messages buffered per subscriber. Defaults to 64.
+        """
+        self.queue_size = queue_size
+        self.subscribers = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+        if isinstance(address, str) and os.path.exists(address):
+            # Only replace the socket a previous publisher left behind
+            if not stat.S_ISSOCK(os.stat(address).st_mode):
+                raise FileExistsError(f"{address} exists and is not a socket")
+            os.unlink(address)
+        self.server = _create_socket(address)
+        if not isinstance(address, str):
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(address)
+        self.server.listen()
+        self.address = self.server.getsockname()
+        # Identity of the socket file created here, so close() never removes another one
+        self._socket_file = _file_id(address) if isinstance(address, str) else None
+
+        self.accept_thread = threading.Thread(target=self._accept, name="sightvision-publisher", daemon=True)
+        self.accept_thread.start()
+
+    def publish(self, message: bytes):
+        """
+        Queues a message for every subscriber.
+        """
+        is_key = not decode_header(message)["flags"] & FLAG_DELTA
+        with self._lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber.send(message, is_key)
+
+    def close(self):
+        """
+        Disconnects the subscribers and stops listening.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            # close() alone does not wake up a thread blocked in accept()
+            self.server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.server.close()
+        self.accept_thread.join()
+        with self._lock:
+            subscribers, self.subscribers = self.subscribers, []
+        for subscriber in subscribers:
+            subscriber.close()
+        for subscriber in subscribers:
+            subscriber.thread.join()
+        if self._socket_file is not None and _file_id(self.address) == self._socket_file:
+            os.unlink(self.address)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return
+            if self._closed:
+                connection.close()
+                return
+            subscriber = _Subscriber(connection, self.queue_size, self._remove)
+            with self._lock:
+                self.subscribers.append(subscriber)
+
+    def _remove(self, subscriber):
+        with self._lock:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+
+
+class _Subscriber:
+    """
+    Connection of one subscriber on the publisher side.
+    """
+
+    def __init__(self, connection, queue_size, on_close):
+        self.connection = connection
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.needs_keyframe = True
+        self.dropped = 0
+        self.on_close = on_close
+        self.thread = threading.Thread(target=self._send_loop, name="sightvision-subscriber", daemon=True)
+        self.thread.start()
+
+    def send(self, message, is_key):
+        if self.needs_keyframe and not is_key:
+            return
+        try:
+            self.queue.put_nowait(message)
+            self.needs_keyframe = False
+        except queue.Full:
+            self.dropped += 1
+            self.needs_keyframe = True
+
+    def close(self):
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            # The sender is stuck on a slow client, unblock it
+            self.connection.shutdown(socket.SHUT_RDWR)
+
+    def _send_loop(self):
+        try:
+            while True:
+                message = self.queue.get()
+                if message is None:
+                    break
+                self.connection.sendall(_LENGTH.pack(len(message)) + message)
+        except OSError:
+            pass
+        finally:
+            self.connection.close()
+            self.on_close(self)
+
+
+class ResultSubscriber:
+    """
+    Receives and decodes the messages of a ResultPublisher.
+
+    Each message is received into its own buffer, and the arrays returned
+    are views on it, so nothing is copied after the socket read.
+    """
+
+    def __init__(self, address: Union[str, Tuple[str, int]] = ("127.0.0.1", 5555), timeout: Optional[float] = None):
+        """
+        Args:
+            address: Path of a Unix socket, or (host, port) for TCP.
+            timeout (float, optional): Seconds to wait for a message.
+        """
+        self.connection = _create_socket(address)
+        self.connection.settimeout(timeout)
+        self.connection.connect(address)
+        self.decoder = ResultDecoder()
+        self._length = bytearray(_LENGTH.size)
+
+    def receive(self) -> Optional[Dict[str, Any]]:
+        """
+        Waits for the next message.
+        Returns:
+            dict: The decoded message, see `decode`, or None when the publisher closed.
+        """
+        if not self._receive_into(memoryview(self._length)):
+            return None
+        message = bytearray(_LENGTH.unpack(self._length)[0])
+        if not self._receive_into(memoryview(message)):
+            return None
+        return self.decoder.decode(message)
+
+    def __iter__(self):
+        while True:
+            result = self.receive()
+            if result is None:
+                return
+            yield result
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _receive_into(self, view):
+        while len(view):
+            received = self.connection.recv_into(view)
+            if received == 0:
+                return False
+            view = view[received:]
+        return True
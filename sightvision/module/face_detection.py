@@ -2,12 +2,16 @@
 Face Detection Module
 Copyright (c) 2022 Leonardi Melo
 """
+import threading
+
 import cv2
 import mediapipe as mp
 
 from typing import Tuple, List, Dict, Any, Union, Optional
 
 from sightvision.utils.basics import rounded_rectangle
+from sightvision.utils.buffers import FrameBuffer, to_rgb
+from sightvision.utils.tracker import BoxTracker
 from sightvision.configuration.constants import _RECTANGLE_DEFAULT_COLOR
 
 
@@ -16,11 +20,56 @@ class FaceDetector:
     Class for detecting faces in an image using the MediaPipe Face Detection model.
     """
 
-    def __init__(self, min_detection_confidense=0.5):
+    def __init__(self, min_detection_confidense=0.5, inference_scale=1.0, track_ids=False, bounded_memory=False):
+        """
+        Args:
+            min_detection_confidense (float, optional): Minimum confidence to detect a face. Defaults to 0.5.
+            inference_scale (float, optional): Resize factor of the image given to the model. Defaults to 1.0.
+            track_ids (bool, optional): Give each face a "track_id" that stays the same across the frames
+                of a video. Defaults to False.
+            bounded_memory (bool, optional): Keep nothing frame-sized between calls, for long running
+                processes: no results are kept and the RGB buffer is freed after each frame, at the cost
+                of one frame allocation per call. Defaults to False.
+        """
         self.min_detection_confidense = min_detection_confidense
+        self.inference_scale = inference_scale
+        self.bounded_memory = bounded_memory
+        self.results = None
         self.media_pipe_face_Fetection = mp.solutions.face_detection
         self.media_pipe_draw = mp.solutions.drawing_utils
         self.face_detection = self.media_pipe_face_Fetection.FaceDetection(self.min_detection_confidense)
+        # A mediapipe graph can only run one frame at a time
+        self._lock = threading.Lock()
+        # The RGB copy of each frame is written into the same buffer
+        self._rgb_buffer = FrameBuffer()
+        self.tracker = BoxTracker() if track_ids else None
+
+    def reconfigure(self, inference_scale=None):
+        """
+        Changes the detector settings between two frames.
+        Args:
+            inference_scale (float, optional): Resize factor of the image given to the model.
+        """
+        with self._lock:
+            if inference_scale is not None:
+                self.inference_scale = inference_scale
+
+    def close(self):
+        """
+        Releases the mediapipe graph and the frame buffer, the detector can not be used afterwards.
+        """
+        with self._lock:
+            if self.face_detection is not None:
+                self.face_detection.close()
+                self.face_detection = None
+            self._rgb_buffer.release()
+            self.results = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def draw_detections(
         self,
@@ -136,7 +185,8 @@ class FaceDetector:
                    thickness=1,
                    external_info=False,
                    internal_info=False,
-                   debug=False):
+                   debug=False,
+                   draw=True):
         """
         Finds faces in the given frame using the face detection model.
 
@@ -148,13 +198,19 @@ class FaceDetector:
 
         Returns:
             tuple: A tuple containing the modified frame with detections and a list of bounding boxes.
+            Each box has the "track_id" of the face when the detector was created with track_ids.
         """
-        image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        self.results = self.face_detection.process(image_rgb)
+        with self._lock:
+            results = self.face_detection.process(to_rgb(frame, self._rgb_buffer, self.inference_scale))
+            if self.bounded_memory:
+                # Nothing frame-sized is kept until the next call
+                self._rgb_buffer.release()
+            else:
+                self.results = results
         bboxs = []
 
-        if self.results.detections:
-            for id, detection in enumerate(self.results.detections):
+        if results.detections:
+            for id, detection in enumerate(results.detections):
                 bbox_confidence = detection.location_data.relative_bounding_box
                 ih, iw, ic = frame.shape
 
@@ -177,7 +233,12 @@ class FaceDetector:
                 }
                 bboxs.append(bbox_info)
 
-                self.draw_detections(frame, bbox, x, y, cx, cy, detection, view_mode, color, thickness,
-                                     external_info, internal_info, debug)
+                if draw:
+                    self.draw_detections(frame, bbox, x, y, cx, cy, detection, view_mode, color, thickness,
+                                         external_info, internal_info, debug)
+
+        if self.tracker is not None:
+            for bbox_info, track_id in zip(bboxs, self.tracker.update([face["bbox"] for face in bboxs])):
+                bbox_info["track_id"] = track_id
 
         return frame, bboxs
@@ -1,6 +1,10 @@
 import cv2
 import mediapipe as mp
 import math
+import threading
+
+from sightvision.utils.buffers import FrameBuffer, to_rgb
+from sightvision.utils.rendering import FACE_MESH_EDGES, LandmarkRenderer
 
 
 class FaceMeshDetector:
@@ -14,7 +18,10 @@ class FaceMeshDetector:
                  max_faces=2,
                  min_detection_confidence=0.5,
                  min_track_confidence=0.5,
-                 color=(0, 255, 0)):
+                 color=(0, 255, 0),
+                 inference_scale=1.0,
+                 fast_draw=False,
+                 bounded_memory=False):
         """
         Initializes the Face Mesh Detector.
         Args:
@@ -22,19 +29,80 @@ class FaceMeshDetector:
             maxFaces: Maximum number of faces to detect
             min_detection_confidence: Minimum Detection Confidence
             min_track_confidence: Minimum Tracking Confidence
+            inference_scale: Resize factor of the image given to the model
+            fast_draw: Draw the face contours with one OpenCV call instead of mediapipe drawing_utils
+            bounded_memory: Keep nothing frame-sized between calls, for long running processes: no results
+                are kept and the RGB buffer is freed after each frame, at the cost of one frame allocation per call
         """
         self.staticMode = static_mode
         self.max_faces = max_faces
         self.min_detection_confidence = min_detection_confidence
         self.min_track_confidence = min_track_confidence
+        self.inference_scale = inference_scale
+        self.bounded_memory = bounded_memory
+        self.results = None
 
         self.mp_draw = mp.solutions.drawing_utils
         self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(static_image_mode=self.staticMode,
-                                                    max_num_faces=self.max_faces,
-                                                    min_detection_confidence=self.min_detection_confidence,
-                                                    min_tracking_confidence=self.min_track_confidence)
+        self.face_mesh = self._create_graph()
         self.draw_spec = self.mp_draw.DrawingSpec(thickness=1, circle_radius=0, color=color)
+        self.renderer = LandmarkRenderer(FACE_MESH_EDGES, color=color, thickness=1, point_color=color,
+                                         point_radius=0) if fast_draw else None
+        # A mediapipe graph can only run one frame at a time
+        self._lock = threading.Lock()
+        # The RGB copy of each frame is written into the same buffer
+        self._rgb_buffer = FrameBuffer()
+
+    def _create_graph(self):
+        return self.mp_face_mesh.FaceMesh(static_image_mode=self.staticMode,
+                                          max_num_faces=self.max_faces,
+                                          min_detection_confidence=self.min_detection_confidence,
+                                          min_tracking_confidence=self.min_track_confidence)
+
+    def reconfigure(self, static_mode=None, max_faces=None, inference_scale=None):
+        """
+        Changes the detector settings between two frames.
+        The mediapipe graph is only rebuilt when one of its settings changes.
+        Args:
+            static_mode: In static mode, detection is done on each image: slower
+            max_faces: Maximum number of faces to detect
+            inference_scale: Resize factor of the image given to the model
+        """
+        with self._lock:
+            if inference_scale is not None:
+                self.inference_scale = inference_scale
+            if (static_mode is None or static_mode == self.staticMode) and \
+                    (max_faces is None or max_faces == self.max_faces):
+                return
+
+            previous = self.staticMode, self.max_faces
+            self.staticMode = self.staticMode if static_mode is None else static_mode
+            self.max_faces = self.max_faces if max_faces is None else max_faces
+            try:
+                graph = self._create_graph()
+            except Exception:
+                # Keep running with the previous graph
+                self.staticMode, self.max_faces = previous
+                raise
+            self.face_mesh.close()
+            self.face_mesh = graph
+
+    def close(self):
+        """
+        Releases the mediapipe graph and the frame buffer, the detector can not be used afterwards.
+        """
+        with self._lock:
+            if self.face_mesh is not None:
+                self.face_mesh.close()
+                self.face_mesh = None
+            self._rgb_buffer.release()
+            self.results = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def findface_mesh(self, img, draw=True):
         """
@@ -46,22 +114,32 @@ class FaceMeshDetector:
             Image with or without drawings
             Landmark points in pixel format
         """
-        self.img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        self.results = self.face_mesh.process(self.img_rgb)
+        with self._lock:
+            results = self.face_mesh.process(to_rgb(img, self._rgb_buffer, self.inference_scale))
+            if self.bounded_memory:
+                # Nothing frame-sized is kept until the next call
+                self._rgb_buffer.release()
+            else:
+                self.results = results
         faces = []
 
-        if self.results.multi_face_landmarks:
-            for face_landmarks in self.results.multi_face_landmarks:
-                if draw:
+        ih, iw, ic = img.shape
+
+        if results.multi_face_landmarks:
+            for face_landmarks in results.multi_face_landmarks:
+                if draw and self.renderer is None:
                     self.mp_draw.draw_landmarks(img, face_landmarks, self.mp_face_mesh.FACEMESH_CONTOURS,
                                                 self.draw_spec, self.draw_spec)
 
                 face = []
                 for id, lm in enumerate(face_landmarks.landmark):
-                    ih, iw, ic = img.shape
                     x, y = int(lm.x * iw), int(lm.y * ih)
                     face.append([x, y])
                 faces.append(face)
+
+        if draw and self.renderer is not None:
+            # Every face in one call
+            self.renderer.draw(img, faces)
         return img, faces
 
     def find_distance(self, p1, p2, img=None):
@@ -1,8 +1,12 @@
 import cv2
 import mediapipe as mp
 import math
+import threading
 
 from sightvision.utils.basics import rounded_rectangle
+from sightvision.utils.buffers import FrameBuffer, to_rgb
+from sightvision.utils.rendering import HAND_EDGES, LandmarkRenderer
+from sightvision.utils.tracker import BoxTracker
 from sightvision.configuration.constants import _RECTANGLE_DEFAULT_COLOR, _LINE_DEFAULT_SIZE
 
 
@@ -14,28 +18,88 @@ class HandDetector:
     provides bounding box info of the hand found.
     """
 
-    def __init__(self, mode=False, max_hands=2, detection_confidence=0.5, min_track_confidence=0.5):
+    def __init__(self, mode=False, max_hands=2, detection_confidence=0.5, min_track_confidence=0.5,
+                 inference_scale=1.0, track_ids=False, fast_draw=False, bounded_memory=False):
         """
         Args:
             mode: In static mode, detection is done on each image: slower
             maxHands: Maximum number of hands to detect
             detectionCon: Minimum Detection Confidence
             trackCon: Minimum Tracking Confidence
+            inference_scale: Resize factor of the image given to the model
+            track_ids: Give each hand a "track_id" that stays the same across the frames of a video
+            fast_draw: Draw the hand skeletons with one OpenCV call instead of mediapipe drawing_utils
+            bounded_memory: Keep nothing frame-sized between calls, for long running processes: no results
+                are kept and the RGB buffer is freed after each frame, at the cost of one frame allocation per call
         """
         self.mode = mode
         self.max_hands = max_hands
         self.detection_confidence = detection_confidence
         self.min_track_confidence = min_track_confidence
+        self.inference_scale = inference_scale
+        self.bounded_memory = bounded_memory
+        self.results = None
 
         self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(static_image_mode=self.mode,
-                                         max_num_hands=self.max_hands,
-                                         min_detection_confidence=self.detection_confidence,
-                                         min_tracking_confidence=self.min_track_confidence)
+        self.hands = self._create_graph()
         self.mp_draw = mp.solutions.drawing_utils
         self.tip_ids = [4, 8, 12, 16, 20]
-        self.fingers = []
-        self.lm_list = []
+        # A mediapipe graph can only run one frame at a time
+        self._lock = threading.Lock()
+        # The RGB copy of each frame is written into the same buffer
+        self._rgb_buffer = FrameBuffer()
+        self.tracker = BoxTracker() if track_ids else None
+        self.renderer = LandmarkRenderer(HAND_EDGES) if fast_draw else None
+
+    def _create_graph(self):
+        return self.mp_hands.Hands(static_image_mode=self.mode,
+                                   max_num_hands=self.max_hands,
+                                   min_detection_confidence=self.detection_confidence,
+                                   min_tracking_confidence=self.min_track_confidence)
+
+    def reconfigure(self, mode=None, max_hands=None, inference_scale=None):
+        """
+        Changes the detector settings between two frames.
+        The mediapipe graph is only rebuilt when one of its settings changes.
+        Args:
+            mode: In static mode, detection is done on each image: slower
+            max_hands: Maximum number of hands to detect
+            inference_scale: Resize factor of the image given to the model
+        """
+        with self._lock:
+            if inference_scale is not None:
+                self.inference_scale = inference_scale
+            if (mode is None or mode == self.mode) and (max_hands is None or max_hands == self.max_hands):
+                return
+
+            previous = self.mode, self.max_hands
+            self.mode = self.mode if mode is None else mode
+            self.max_hands = self.max_hands if max_hands is None else max_hands
+            try:
+                graph = self._create_graph()
+            except Exception:
+                # Keep running with the previous graph
+                self.mode, self.max_hands = previous
+                raise
+            self.hands.close()
+            self.hands = graph
+
+    def close(self):
+        """
+        Releases the mediapipe graph and the frame buffer, the detector can not be used afterwards.
+        """
+        with self._lock:
+            if self.hands is not None:
+                self.hands.close()
+                self.hands = None
+            self._rgb_buffer.release()
+            self.results = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def find_hands(self,
                    img,
@@ -52,14 +116,19 @@ class HandDetector:
             flipType: Flip the hand type.
         Returns:
             Image with or without drawings
-            List of hands with landmarks"""
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        self.results = self.hands.process(img_rgb)
+            List of hands with landmarks, and their "track_id" when created with track_ids"""
+        with self._lock:
+            results = self.hands.process(to_rgb(img, self._rgb_buffer, self.inference_scale))
+            if self.bounded_memory:
+                # Nothing frame-sized is kept until the next call
+                self._rgb_buffer.release()
+            else:
+                self.results = results
         all_hands = []
         h, w, c = img.shape
 
-        if self.results.multi_hand_landmarks:
-            for handType, handLms in zip(self.results.multi_handedness, self.results.multi_hand_landmarks):
+        if results.multi_hand_landmarks:
+            for handType, handLms in zip(results.multi_handedness, results.multi_hand_landmarks):
                 my_hand = {}
                 my_land_mark_list = []
                 x_list = []
@@ -95,7 +164,8 @@ class HandDetector:
                 all_hands.append(my_hand)
 
                 if draw:
-                    self.mp_draw.draw_landmarks(img, handLms, self.mp_hands.HAND_CONNECTIONS)
+                    if self.renderer is None:
+                        self.mp_draw.draw_landmarks(img, handLms, self.mp_hands.HAND_CONNECTIONS)
 
                     rounded_rectangle(
                         img,
@@ -108,6 +178,15 @@ class HandDetector:
 
                     cv2.putText(img, my_hand["type"], (bbox[0] - 30, bbox[1] - 30), cv2.FONT_HERSHEY_SIMPLEX, 0.5,
                                 color, 1)
+
+        if draw and self.renderer is not None:
+            # Every hand in one call
+            self.renderer.draw(img, [hand["lmList"] for hand in all_hands])
+
+        if self.tracker is not None:
+            for my_hand, track_id in zip(all_hands, self.tracker.update([hand["bbox"] for hand in all_hands])):
+                my_hand["track_id"] = track_id
+
         if draw:
             return all_hands, img
         else:
@@ -116,31 +195,34 @@ class HandDetector:
     def fingersUp(self, myHand):
         """
         Finds how many fingers are open and returns in a list.
-        Considers left and right hands separately
+        Considers left and right hands separately.
+        Only reads the given hand, so it is safe to call from any thread.
         :return: List of which fingers are up
         """
         myHandType = myHand["type"]
         myLmList = myHand["lmList"]
-        if self.results.multi_hand_landmarks:
-            fingers = []
-            # Thumb
-            if myHandType == "Right":
-                if myLmList[self.tip_ids[0]][0] > myLmList[self.tip_ids[0] - 1][0]:
-                    fingers.append(1)
-                else:
-                    fingers.append(0)
+        fingers = []
+        if not myLmList:
+            return fingers
+
+        # Thumb
+        if myHandType == "Right":
+            if myLmList[self.tip_ids[0]][0] > myLmList[self.tip_ids[0] - 1][0]:
+                fingers.append(1)
             else:
-                if myLmList[self.tip_ids[0]][0] < myLmList[self.tip_ids[0] - 1][0]:
-                    fingers.append(1)
-                else:
-                    fingers.append(0)
+                fingers.append(0)
+        else:
+            if myLmList[self.tip_ids[0]][0] < myLmList[self.tip_ids[0] - 1][0]:
+                fingers.append(1)
+            else:
+                fingers.append(0)
 
-            # 4 Fingers
-            for id in range(1, 5):
-                if myLmList[self.tip_ids[id]][1] < myLmList[self.tip_ids[id] - 2][1]:
-                    fingers.append(1)
-                else:
-                    fingers.append(0)
+        # 4 Fingers
+        for id in range(1, 5):
+            if myLmList[self.tip_ids[id]][1] < myLmList[self.tip_ids[id] - 2][1]:
+                fingers.append(1)
+            else:
+                fingers.append(0)
         return fingers
 
     def find_distance(self,
@@ -0,0 +1,269 @@
+"""
+Multi-Person Pose Estimation Module
+Copyright (c) 2022 Leonardi Melo
+"""
+import itertools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+from typing import Any, Callable, List, Optional, Tuple
+
+from sightvision.module.face_detection import FaceDetector
+from sightvision.module.pose_estimation import PoseDetector
+from sightvision.utils.basics import rounded_rectangle
+from sightvision.utils.rendering import POSE_EDGES, LandmarkRenderer
+from sightvision.utils.tracker import greedy_match, iou_matrix
+from sightvision.configuration.constants import _RECTANGLE_DEFAULT_COLOR, _LINE_DEFAULT_SIZE
+
+
+def _clip_box(box, width, height):
+    x, y, w, h = box
+    x1, y1 = max(int(x), 0), max(int(y), 0)
+    x2, y2 = min(int(x + w), width), min(int(y + h), height)
+    return x1, y1, max(x2 - x1, 0), max(y2 - y1, 0)
+
+
+class MultiPoseDetector:
+    """
+    Estimates the pose of several people by running the single person
+    mediapipe Pose model on a crop around each person.
+
+    Person regions come from FaceDetector boxes (or any region detector) and
+    are then followed from the previous pose of each person, so the region
+    detector only runs every few frames. The crops are spread across a pool
+    of pose graphs running on worker threads.
+    """
+
+    def __init__(self,
+                 max_people=4,
+                 workers=None,
+                 region_detector: Optional[Callable[[Any], List[Tuple[int, int, int, int]]]] = None,
+                 redetect_interval=10,
+                 max_missed=5,
+                 max_unmatched=3,
+                 iou_threshold=0.3,
+                 detection_confidence=0.5,
+                 track_confidence=0.5,
+                 fast_draw=False,
+                 bounded_memory=False):
+        """
+        Args:
+            max_people: Maximum number of people to follow.
+            workers: Number of pose graphs running at once. Defaults to max_people.
+            region_detector: Callable returning the (x, y, w, h) person regions of a BGR
+                frame. Defaults to body regions derived from FaceDetector boxes.
+            redetect_interval: Run the region detector every this many frames.
+            max_missed: Frames a person can go without a pose before being dropped.
+            max_unmatched: Redetections a person can go without a region before its track turns stale.
+                A stale track is kept while its pose is found, but dropped on the first frame without
+                one, and gives its place to a new person when max_people are followed.
+            iou_threshold: Minimum overlap to match a detected region with a known person.
+            detection_confidence: Minimum confidence required to detect a landmark.
+            track_confidence: Minimum confidence required to track a landmark.
+            fast_draw: Draw the skeletons of everyone with one OpenCV call instead of mediapipe drawing_utils.
+            bounded_memory: Keep nothing frame-sized between calls, for long running processes, see PoseDetector.
+        """
+        self.max_people = max_people
+        self.workers = workers or max_people
+        self.redetect_interval = redetect_interval
+        self.max_missed = max_missed
+        self.max_unmatched = max_unmatched
+        self.iou_threshold = iou_threshold
+
+        self.face_detector = None
+        if region_detector is None:
+            self.face_detector = FaceDetector(min_detection_confidense=detection_confidence,
+                                              bounded_memory=bounded_memory)
+            region_detector = self.find_person_regions
+        self.region_detector = region_detector
+
+        # Crops change from frame to frame, so every graph runs in static mode
+        self.pose_detectors = queue.Queue()
+        for _ in range(self.workers):
+            self.pose_detectors.put(
+                PoseDetector(mode=True, detection_confidence=detection_confidence, track_confidence=track_confidence,
+                             bounded_memory=bounded_memory))
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sightvision-pose")
+        self.mp_draw = mp.solutions.drawing_utils
+        self.mpPose = mp.solutions.pose
+        self.renderer = LandmarkRenderer(POSE_EDGES) if fast_draw else None
+
+        self.tracks = {}
+        self.frame_count = 0
+        self._next_id = itertools.count()
+        self._lock = threading.Lock()
+
+    def find_person_regions(self, img):
+        """
+        Derives a body region below every face found in the image.
+        Args:
+            img: Image in BGR format.
+        Returns:
+            List of (x, y, w, h) regions
+        """
+        _, faces = self.face_detector.find_faces(img, draw=False)
+        regions = []
+        for face in faces:
+            x, y, w, h = face["bbox"]
+            cx = x + w // 2
+            # A standing body is roughly three faces wide and eight faces tall
+            regions.append((cx - int(1.5 * w), y - h // 2, 3 * w, 8 * h))
+        return regions
+
+    def _estimate(self, img, region):
+        x, y, w, h = region
+        crop = img[y:y + h, x:x + w]
+        pose_detector = self.pose_detectors.get()
+        try:
+            results = pose_detector.process(crop)
+            lmList, bboxInfo = pose_detector.find_position(crop, draw=False, results=results)
+        finally:
+            self.pose_detectors.put(pose_detector)
+
+        if not lmList:
+            return None, results
+
+        lmList = [[id, px + x, py + y, pz] for id, px, py, pz in lmList]
+        bx, by, bw, bh = bboxInfo["bbox"]
+        cx, cy = bboxInfo["center"]
+        return {"lmList": lmList, "bbox": (bx + x, by + y, bw, bh), "center": (cx + x, cy + y)}, results
+
+    def _match_regions(self, regions):
+        """
+        Matches freshly detected regions with the known people, greedily by overlap.
+        People no region was found for count as unmatched. Their pose is still
+        followed, since the region detector can lose people that are visible,
+        e.g. faces turned away.
+        """
+        track_ids = list(self.tracks)
+        overlaps = iou_matrix([self.tracks[track_id]["region"] for track_id in track_ids], regions)
+        used_regions = set()
+        matched = set()
+        for row, index in greedy_match(overlaps, self.iou_threshold):
+            used_regions.add(index)
+            matched.add(track_ids[row])
+            self.tracks[track_ids[row]]["region"] = regions[index]
+            self.tracks[track_ids[row]]["unmatched"] = 0
+
+        for track_id in track_ids:
+            if track_id not in matched:
+                self.tracks[track_id]["unmatched"] += 1
+
+        for index, region in enumerate(regions):
+            if index in used_regions:
+                continue
+            if len(self.tracks) >= self.max_people:
+                stale = [track_id for track_id, track in self.tracks.items()
+                         if track["unmatched"] > self.max_unmatched]
+                if not stale:
+                    continue
+                # The track the region detector lost for the longest gives its place
+                del self.tracks[max(stale, key=lambda track_id: self.tracks[track_id]["unmatched"])]
+            self.tracks[next(self._next_id)] = {"region": region, "missed": 0, "unmatched": 0}
+
+    def _suppress_duplicates(self, track_ids):
+        """
+        Drops the tracks whose region overlaps an older track, which happens when
+        two crops lock onto the same person. Returns the ids of the dropped tracks.
+        """
+        overlaps = iou_matrix([self.tracks[track_id]["region"] for track_id in track_ids],
+                              [self.tracks[track_id]["region"] for track_id in track_ids])
+        kept, dropped = [], set()
+        # Ids grow with the age of the tracks, the oldest one keeps the person
+        for row in np.argsort(track_ids, kind="stable"):
+            if any(overlaps[row, other] > self.iou_threshold for other in kept):
+                dropped.add(track_ids[row])
+                del self.tracks[track_ids[row]]
+            else:
+                kept.append(row)
+        return dropped
+
+    def find_poses(self, img, draw=True, color=_RECTANGLE_DEFAULT_COLOR, line_size=_LINE_DEFAULT_SIZE):
+        """
+        Finds the pose of every person in a BGR image.
+
+        Args:
+            img: Image to find the poses in.
+            draw: Flag to draw the poses on the image.
+        Returns:
+            List of people, each with its track "id", "lmList", "bbox", "center"
+            and the "region" the pose was estimated in.
+        """
+        ih, iw, _ = img.shape
+        with self._lock:
+            if not self.tracks or self.frame_count % self.redetect_interval == 0:
+                regions = [_clip_box(region, iw, ih) for region in self.region_detector(img)]
+                self._match_regions([region for region in regions if region[2] > 0 and region[3] > 0])
+            self.frame_count += 1
+
+            tracks = list(self.tracks.items())
+            futures = [self.pool.submit(self._estimate, img, track["region"]) for _, track in tracks]
+
+            people = []
+            found = []
+            for (track_id, track), future in zip(tracks, futures):
+                person, results = future.result()
+                if person is None:
+                    track["missed"] += 1
+                    if track["missed"] > self.max_missed or track["unmatched"] > self.max_unmatched:
+                        del self.tracks[track_id]
+                    continue
+
+                person["id"] = track_id
+                person["region"] = track["region"]
+                people.append(person)
+                found.append(results)
+
+                # Follow the person from its pose, padded so the next frame still fits
+                xs = [lm[1] for lm in person["lmList"]]
+                ys = [lm[2] for lm in person["lmList"]]
+                pad_x = (max(xs) - min(xs)) // 4 + 1
+                pad_y = (max(ys) - min(ys)) // 8 + 1
+                track["region"] = _clip_box(
+                    (min(xs) - pad_x, min(ys) - pad_y, max(xs) - min(xs) + 2 * pad_x, max(ys) - min(ys) + 2 * pad_y),
+                    iw, ih)
+                track["missed"] = 0
+
+            dropped = self._suppress_duplicates([person["id"] for person in people])
+            if dropped:
+                kept = [index for index, person in enumerate(people) if person["id"] not in dropped]
+                people = [people[index] for index in kept]
+                found = [found[index] for index in kept]
+
+        # Draw once every crop is done, the workers read the image until then
+        if draw:
+            if self.renderer is not None and people:
+                self.renderer.draw(img, [[lm[1:3] for lm in person["lmList"]] for person in people])
+            for person, results in zip(people, found):
+                if self.renderer is None:
+                    x, y, w, h = person["region"]
+                    self.mp_draw.draw_landmarks(img[y:y + h, x:x + w], results.pose_landmarks,
+                                                self.mpPose.POSE_CONNECTIONS)
+                rounded_rectangle(img, person["bbox"], lenght_of_corner=20, thickness_of_line=line_size,
+                                  radius_corner=0, color_rectangle=color)
+                cv2.putText(img, str(person["id"]), (person["bbox"][0], person["bbox"][1] - 10),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+
+        return people
+
+    def close(self):
+        """
+        Stops the worker threads and releases the mediapipe graphs.
+        """
+        self.pool.shutdown(wait=True)
+        while not self.pose_detectors.empty():
+            self.pose_detectors.get_nowait().close()
+        if self.face_detector is not None:
+            self.face_detector.close()
+        self.tracks.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,8 +1,11 @@
 import cv2
 import mediapipe as mp
 import math
+import threading
 
 from sightvision.utils.basics import rounded_rectangle
+from sightvision.utils.buffers import FrameBuffer, to_rgb
+from sightvision.utils.rendering import POSE_EDGES, LandmarkRenderer, landmark_array
 from sightvision.configuration.constants import _RECTANGLE_DEFAULT_COLOR, _CIRCLE_DEFAULT_COLOR, _LINE_DEFAULT_SIZE
 
 
@@ -11,7 +14,8 @@ class PoseDetector:
     Estimates Pose points of a human body using the mediapipe library.
     """
 
-    def __init__(self, mode=False, smooth=True, detection_confidence=0.5, track_confidence=0.5):
+    def __init__(self, mode=False, smooth=True, detection_confidence=0.5, track_confidence=0.5,
+                 model_complexity=1, inference_scale=1.0, fast_draw=False, bounded_memory=False):
         """
         Initializes the PoseDetector object.
         Args:
@@ -19,19 +23,110 @@ class PoseDetector:
             smooth: Smoothness of the landmarks.
             detectionCon: Minimum confidence required to detect a landmark.
             trackCon: Minimum confidence required to track a landmark.
+            model_complexity: Pose model to use, 0 (lite), 1 (full) or 2 (heavy).
+            inference_scale: Resize factor of the image given to the model.
+            fast_draw: Draw the skeleton with one OpenCV call instead of mediapipe drawing_utils.
+            bounded_memory: Keep nothing frame-sized between calls, for long running processes: the RGB
+                buffer is freed after each frame, at the cost of one frame allocation per call, and no
+                results or landmarks are kept, so they have to be passed explicitly.
         """
 
         self.mode = mode
         self.smooth = smooth
         self.detectionCon = detection_confidence
         self.trackCon = track_confidence
+        self.model_complexity = model_complexity
+        self.inference_scale = inference_scale
+        self.bounded_memory = bounded_memory
+        self.results = None
+        self.lmList = None
+        self.bboxInfo = None
 
         self.mp_draw = mp.solutions.drawing_utils
         self.mpPose = mp.solutions.pose
-        self.pose = self.mpPose.Pose(static_image_mode=self.mode,
-                                     smooth_landmarks=self.smooth,
-                                     min_detection_confidence=self.detectionCon,
-                                     min_tracking_confidence=self.trackCon)
+        self.pose = self._create_graph()
+        self.renderer = LandmarkRenderer(POSE_EDGES) if fast_draw else None
+        # A mediapipe graph can only run one frame at a time
+        self._lock = threading.Lock()
+        # The RGB copy of each frame is written into the same buffer
+        self._rgb_buffer = FrameBuffer()
+
+    def _create_graph(self):
+        return self.mpPose.Pose(static_image_mode=self.mode,
+                                model_complexity=self.model_complexity,
+                                smooth_landmarks=self.smooth,
+                                min_detection_confidence=self.detectionCon,
+                                min_tracking_confidence=self.trackCon)
+
+    def reconfigure(self, mode=None, model_complexity=None, inference_scale=None):
+        """
+        Changes the detector settings between two frames.
+        The mediapipe graph is only rebuilt when one of its settings changes.
+        Args:
+            mode: Inference mode of the Pose model.
+            model_complexity: Pose model to use, 0 (lite), 1 (full) or 2 (heavy).
+            inference_scale: Resize factor of the image given to the model.
+        """
+        with self._lock:
+            if inference_scale is not None:
+                self.inference_scale = inference_scale
+            if (mode is None or mode == self.mode) and \
+                    (model_complexity is None or model_complexity == self.model_complexity):
+                return
+
+            previous = self.mode, self.model_complexity
+            self.mode = self.mode if mode is None else mode
+            self.model_complexity = self.model_complexity if model_complexity is None else model_complexity
+            try:
+                graph = self._create_graph()
+            except Exception:
+                # Keep running with the previous graph
+                self.mode, self.model_complexity = previous
+                raise
+            self.pose.close()
+            self.pose = graph
+
+    def close(self):
+        """
+        Releases the mediapipe graph and the frame buffer, the detector can not be used afterwards.
+        """
+        with self._lock:
+            if self.pose is not None:
+                self.pose.close()
+                self.pose = None
+            self._rgb_buffer.release()
+            self.results = None
+            self.lmList = None
+            self.bboxInfo = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _last(self, name):
+        value = getattr(self, name)
+        if value is None:
+            raise ValueError(f"The detector kept no {name}, pass it explicitly")
+        return value
+
+    def process(self, img):
+        """
+        Runs the pose model on a BGR image without drawing anything.
+
+        Args:
+            img: Image to find the pose landmarks.
+        Returns:
+            The mediapipe results, to be passed to `find_position`."""
+        with self._lock:
+            results = self.pose.process(to_rgb(img, self._rgb_buffer, self.inference_scale))
+            if self.bounded_memory:
+                # Nothing frame-sized is kept until the next call
+                self._rgb_buffer.release()
+            else:
+                self.results = results
+        return results
 
     def find_pose(self, img, draw=True):
         """
@@ -42,12 +137,15 @@ class PoseDetector:
             draw: Flag to draw the landmarks on the image.
         Returns:
             Image with or without the landmarks."""
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        self.results = self.pose.process(img_rgb)
+        results = self.process(img)
 
-        if self.results.pose_landmarks:
-            if draw:
-                self.mp_draw.draw_landmarks(img, self.results.pose_landmarks, self.mpPose.POSE_CONNECTIONS)
+        if results.pose_landmarks:
+            if draw and self.renderer is not None:
+                landmarks = landmark_array(results.pose_landmarks, img.shape[1], img.shape[0])
+                # Like drawing_utils, skip the landmarks the model is not sure about
+                self.renderer.draw(img, landmarks, landmarks[:, 2] >= 0.5)
+            elif draw:
+                self.mp_draw.draw_landmarks(img, results.pose_landmarks, self.mpPose.POSE_CONNECTIONS)
 
         return img
 
@@ -58,32 +156,46 @@ class PoseDetector:
                       circle_color=_CIRCLE_DEFAULT_COLOR,
                       circle_size=2,
                       rect_color=_RECTANGLE_DEFAULT_COLOR,
-                      rect_size=_LINE_DEFAULT_SIZE):
-        self.lmList = []
-        self.bboxInfo = {}
+                      rect_size=_LINE_DEFAULT_SIZE,
+                      results=None):
+        """
+        Converts the pose landmarks to pixel positions and finds the body bounding box.
+
+        Args:
+            img: Image the landmarks were found in.
+            draw: Flag to draw the bounding box on the image.
+            bboxWithHands: Widen the bounding box to include the hands.
+            results: Results returned by `process`. Defaults to the last
+                frame processed by this detector, which is not thread safe.
+        Returns:
+            List of landmarks [id, x, y, z] and the bounding box info."""
+        if results is None:
+            results = self._last("results")
+        lmList = []
+        bboxInfo = {}
 
-        if self.results.pose_landmarks:
-            for id, lm in enumerate(self.results.pose_landmarks.landmark):
-                h, w, c = img.shape
+        if results.pose_landmarks:
+            h, w, c = img.shape
+            for id, lm in enumerate(results.pose_landmarks.landmark):
                 cx, cy, cz = int(lm.x * w), int(lm.y * h), int(lm.z * w)
-                self.lmList.append([id, cx, cy, cz])
+                lmList.append([id, cx, cy, cz])
 
             # Bounding Box
-            ad = abs(self.lmList[12][1] - self.lmList[11][1]) // 2
+            ad = abs(lmList[12][1] - lmList[11][1]) // 2
             if bboxWithHands:
-                x1 = self.lmList[16][1] - ad
-                x2 = self.lmList[15][1] + ad
+                x1 = lmList[16][1] - ad
+                x2 = lmList[15][1] + ad
             else:
-                x1 = self.lmList[12][1] - ad
-                x2 = self.lmList[11][1] + ad
+                x1 = lmList[12][1] - ad
+                x2 = lmList[11][1] + ad
 
-            y2 = self.lmList[29][2] + ad
-            y1 = self.lmList[1][2] - ad
+            y2 = lmList[29][2] + ad
+            y1 = lmList[1][2] - ad
             bbox = (x1, y1, x2 - x1, y2 - y1)
             cx, cy = bbox[0] + (bbox[2] // 2), \
                      bbox[1] + bbox[3] // 2
 
-            self.bboxInfo = {"bbox": bbox, "center": (cx, cy)}
+            bboxInfo = {"bbox": bbox, "center": (cx, cy)}
 
             if draw:
                 rounded_rectangle(
@@ -96,7 +208,10 @@ class PoseDetector:
                 )
                 cv2.circle(img, (cx, cy), circle_size, circle_color, cv2.FILLED)
 
-        return self.lmList, self.bboxInfo
+        if not self.bounded_memory:
+            self.lmList = lmList
+            self.bboxInfo = bboxInfo
+        return lmList, bboxInfo
 
     def find_angle(self,
                    img,
@@ -107,7 +222,8 @@ class PoseDetector:
                    circle_color=_CIRCLE_DEFAULT_COLOR,
                    circle_size=2,
                    line_color=_RECTANGLE_DEFAULT_COLOR,
-                   line_size=_LINE_DEFAULT_SIZE):
+                   line_size=_LINE_DEFAULT_SIZE,
+                   lmList=None):
         """
         Finds the angle between three points.
         
@@ -117,13 +233,17 @@ class PoseDetector:
             p2: Point 2. The angle is calculated from this point.
             p3: Point 3.
             draw: Flag to draw the angle on the image.
+            lmList: Landmarks returned by `find_position`. Defaults to the
+                last landmarks found by this detector.
         Returns:
             The angle between the three points."""
+        if lmList is None:
+            lmList = self._last("lmList")
 
         # Get the landmarks
-        x1, y1 = self.lmList[p1][1:]
-        x2, y2 = self.lmList[p2][1:]
-        x3, y3 = self.lmList[p3][1:]
+        x1, y1 = lmList[p1][1:3]
+        x2, y2 = lmList[p2][1:3]
+        x3, y3 = lmList[p3][1:3]
 
         # Calculate the Angle
         angle = math.degrees(math.atan2(y3 - y2, x3 - x2) - math.atan2(y1 - y2, x1 - x2))
@@ -140,12 +260,14 @@ class PoseDetector:
             cv2.circle(img, (x2, y2), 15, circle_color, circle_size)
             cv2.circle(img, (x3, y3), 10, circle_color, cv2.FILLED)
             cv2.circle(img, (x3, y3), 15, circle_color, circle_size)
-            cv2.putText(img, str(int(angle)), (x2 - 50, y2 + 50), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 255), 0.5)
+            cv2.putText(img, str(int(angle)), (x2 - 50, y2 + 50), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 255), 2)
         return angle
 
-    def find_distance(self, p1, p2, img, draw=True, r=15, t=3):
-        x1, y1 = self.lmList[p1][1:]
-        x2, y2 = self.lmList[p2][1:]
+    def find_distance(self, p1, p2, img, draw=True, r=15, t=3, lmList=None):
+        if lmList is None:
+            lmList = self._last("lmList")
+        x1, y1 = lmList[p1][1:3]
+        x2, y2 = lmList[p2][1:3]
         cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
 
         if draw:
@@ -1,9 +1,8 @@
 import cv2
 import numpy as np
-import copy
 
 
-def stack_images(_image_list, cols, scale):
+def stack_images(_image_list, cols, scale, out=None):
     """
     Stack a list of images horizontally and vertically to create a grid-like arrangement.
 
@@ -11,41 +10,45 @@ def stack_images(_image_list, cols, scale):
         _image_list (list): A list of images to be stacked.
         cols (int): The number of columns in the grid.
         scale (float): The scale factor to resize the images.
+        out (numpy.ndarray, optional): Grid from a previous call. It is reused when
+            its shape matches, so no full-size array is allocated per frame.
 
     Returns:
         numpy.ndarray: The stacked image grid.
     """
-    image_list = copy.deepcopy(_image_list)
-
-    # Make the array full by adding blank img, otherwise the openCV can't work
-    total_images = len(image_list)
+    # Make the grid full with blank cells, otherwise the openCV can't work
+    total_images = len(_image_list)
     rows = total_images // cols if total_images // cols * cols == total_images else total_images // cols + 1
-    blank_images = cols * rows - total_images
 
-    width = image_list[0].shape[1]
-    height = image_list[0].shape[0]
+    width = int(round(_image_list[0].shape[1] * scale))
+    height = int(round(_image_list[0].shape[0] * scale))
 
-    # Add blank images
-    image_blank = np.zeros((height, width, 3), np.uint8)
-    image_list.extend([image_blank] * blank_images)
+    shape = (height * rows, width * cols, 3)
+    if out is None or out.shape != shape or out.dtype != np.uint8:
+        out = np.empty(shape, np.uint8)
 
-    # Resize the images
+    # Resize every image straight into its cell of the board
     for i in range(cols * rows):
-        image_list[i] = cv2.resize(image_list[i], (0, 0), None, scale, scale)
-        if len(image_list[i].shape) == 2:
-            image_list[i] = cv2.cvtColor(image_list[i], cv2.COLOR_GRAY2BGR)
-
-    # Put the images in a board
-    horizontal = [image_blank] * rows
-    for y in range(rows):
-        line = []
-        for x in range(cols):
-            line.append(image_list[y * cols + x])
-        horizontal[y] = np.hstack(line)
-
-    vertical = np.vstack(horizontal)
-
-    return vertical
+        y, x = divmod(i, cols)
+        cell = out[y * height:(y + 1) * height, x * width:(x + 1) * width]
+        if i >= total_images:
+            cell[:] = 0
+            continue
+
+        image = _image_list[i]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        if channels == 1:
+            result = cv2.cvtColor(cv2.resize(image, (width, height)), cv2.COLOR_GRAY2BGR, dst=cell)
+        elif channels == 4:
+            result = cv2.cvtColor(cv2.resize(image, (width, height)), cv2.COLOR_BGRA2BGR, dst=cell)
+        else:
+            result = cv2.resize(image, (width, height), dst=cell)
+        # OpenCV allocates a new array instead of writing into a cell it does not fit
+        if not np.shares_memory(result, cell):
+            raise ValueError(f"Can not stack image {i} with shape {image.shape} and dtype {image.dtype}, "
+                             f"expected 8-bit gray, BGR or BGRA images")
+
+    return out
 
 
 def rounded_rectangle(img,
@@ -92,7 +95,7 @@ def rounded_rectangle(img,
     return img
 
 
-def find_contours(img, imgPre, minArea=1000, sort=True, filter=0, drawCon=True, c=(255, 0, 0)):
+def find_contours(img, imgPre, minArea=1000, sort=True, filter=0, drawCon=True, c=(255, 0, 0), out=None):
     """
     Finds Contours in an image
     :param img: Image on which we want to draw
@@ -101,10 +104,15 @@ def find_contours(img, imgPre, minArea=1000, sort=True, filter=0, drawCon=True,
     :param sort: True will sort the contours by area (biggest first)
     :param filter: Filters based on the corner points e.g. 4 = Rectangle or square
     :param drawCon: draw contours boolean
+    :param out: Image from a previous call to draw into, reused when the shape matches
     :return: Foudn contours with [contours, Area, BoundingBox, Center]
     """
     conFound = []
-    imgContours = img.copy()
+    if out is not None and out.shape == img.shape and out.dtype == img.dtype:
+        imgContours = out
+        np.copyto(imgContours, img)
+    else:
+        imgContours = img.copy()
     contours, hierarchy = cv2.findContours(imgPre, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
 
     for cnt in contours:
@@ -128,22 +136,38 @@ def find_contours(img, imgPre, minArea=1000, sort=True, filter=0, drawCon=True,
     return imgContours, conFound
 
 
-def overlayPNG(imgBack, imgFront, pos=[0, 0]):
+def overlayPNG(imgBack, imgFront, pos=[0, 0], out=None):
+    """
+    Overlays a BGRA image on a BGR image using the alpha channel as mask.
+    Only the region covered by the front image is touched, so no
+    full-size masks are allocated.
+    Args:
+        imgBack: Background image in BGR format
+        imgFront: Image in BGRA format placed over the background
+        pos: Top left corner [x, y] of the front image
+        out: Image from a previous call to write into, reused when the shape matches.
+             Pass imgBack itself to draw in place.
+    Returns:
+        Background image with the overlay
+    """
     hf, wf, cf = imgFront.shape
     hb, wb, cb = imgBack.shape
-    *_, mask = cv2.split(imgFront)
-    maskBGRA = cv2.cvtColor(mask, cv2.COLOR_GRAY2BGRA)
-    maskBGR = cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR)
-    img_rgbA = cv2.bitwise_and(imgFront, maskBGRA)
-    img_rgb = cv2.cvtColor(img_rgbA, cv2.COLOR_BGRA2BGR)
-
-    imgMaskFull = np.zeros((hb, wb, cb), np.uint8)
-    imgMaskFull[pos[1]:hf + pos[1], pos[0]:wf + pos[0], :] = img_rgb
-    imgMaskFull2 = np.ones((hb, wb, cb), np.uint8) * 255
-    maskBGRInv = cv2.bitwise_not(maskBGR)
-    imgMaskFull2[pos[1]:hf + pos[1], pos[0]:wf + pos[0], :] = maskBGRInv
-
-    imgBack = cv2.bitwise_and(imgBack, imgMaskFull2)
-    imgBack = cv2.bitwise_or(imgBack, imgMaskFull)
-
-    return imgBack
+
+    if out is None or out.shape != imgBack.shape or out.dtype != imgBack.dtype:
+        out = imgBack.copy()
+    elif out is not imgBack:
+        np.copyto(out, imgBack)
+
+    # Clip the front image to the part that lands inside the background
+    x1, y1 = max(pos[0], 0), max(pos[1], 0)
+    x2, y2 = min(pos[0] + wf, wb), min(pos[1] + hf, hb)
+    if x1 >= x2 or y1 >= y2:
+        return out
+    front = imgFront[y1 - pos[1]:y2 - pos[1], x1 - pos[0]:x2 - pos[0]]
+
+    mask = front[:, :, 3:]
+    roi = out[y1:y2, x1:x2]
+    np.bitwise_and(roi, np.bitwise_not(mask), out=roi)
+    np.bitwise_or(roi, np.bitwise_and(front[:, :, :3], mask), out=roi)
+
+    return out
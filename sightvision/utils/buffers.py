@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+
+
+class FrameBuffer:
+    """
+    Preallocated array that is reused for every frame of the same shape.
+    A new array is only allocated when the shape or the dtype changes.
+    """
+
+    def __init__(self):
+        self.array = None
+
+    def get(self, shape, dtype=np.uint8):
+        """
+        Returns the buffer for the given shape, allocating it if needed.
+        Args:
+            shape: Shape of the array.
+            dtype: Data type of the array.
+        Returns:
+            numpy.ndarray with uninitialized content
+        """
+        shape = tuple(shape)
+        if self.array is None or self.array.shape != shape or self.array.dtype != dtype:
+            self.array = np.empty(shape, dtype)
+        return self.array
+
+    def release(self):
+        """
+        Drops the reference to the array so its memory can be freed.
+        """
+        self.array = None
+
+
+def to_rgb(img, buffer, scale=1.0):
+    """
+    Converts a BGR image to RGB inside a reusable buffer.
+    Args:
+        img: Image in BGR format.
+        buffer: FrameBuffer that receives the RGB image.
+        scale: Resize factor applied on the way, e.g. 0.5 to run inference at half resolution.
+    Returns:
+        RGB image backed by the buffer
+    """
+    if scale == 1.0:
+        return cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=buffer.get(img.shape, img.dtype))
+
+    h, w = img.shape[:2]
+    size = (max(int(w * scale), 1), max(int(h * scale), 1))
+    rgb = cv2.resize(img, size, dst=buffer.get((size[1], size[0]) + img.shape[2:], img.dtype),
+                     interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(rgb, cv2.COLOR_BGR2RGB, dst=rgb)
@@ -0,0 +1,212 @@
+import numpy as np
+
+_TIP_IDS = (4, 8, 12, 16, 20)
+
+
+class HitTestIndex:
+    """
+    Grid index over rectangular on-screen targets for landmark hit testing.
+
+    Targets are (x, y, w, h) boxes. Every grid cell keeps the ids of the
+    targets overlapping it, so checking whether points are inside a target
+    only looks at the targets of the cell each point falls in. All the
+    points of a frame are answered in one vectorized call.
+    """
+
+    def __init__(self, width, height, cell_size=64):
+        """
+        Args:
+            width: Width of the frame the targets are drawn on.
+            height: Height of the frame the targets are drawn on.
+            cell_size: Side of a grid cell in pixels.
+        """
+        self.cell_size = cell_size
+        self.grid_width = max((width + cell_size - 1) // cell_size, 1)
+        self.grid_height = max((height + cell_size - 1) // cell_size, 1)
+
+        # Targets as x1, y1, x2, y2 rows, removed targets are kept as inactive rows
+        self.boxes = np.zeros((16, 4), np.float32)
+        self.active = np.zeros(16, bool)
+        self.size = 0
+        self._free = []
+
+        # Ids of the targets of every cell, padded with -1
+        self.cells = np.full((self.grid_height, self.grid_width, 4), -1, np.int32)
+        self.counts = np.zeros((self.grid_height, self.grid_width), np.int32)
+
+    def __len__(self):
+        return int(self.active.sum())
+
+    def add(self, bbox):
+        """
+        Adds a target.
+        Args:
+            bbox: Bounding box (x, y, w, h) of the target.
+        Returns:
+            Id of the target
+        """
+        if self._free:
+            target_id = self._free.pop()
+        else:
+            if self.size == len(self.boxes):
+                self.boxes = np.concatenate([self.boxes, np.zeros_like(self.boxes)])
+                self.active = np.concatenate([self.active, np.zeros_like(self.active)])
+            target_id = self.size
+            self.size += 1
+
+        x, y, w, h = bbox
+        self.boxes[target_id] = (x, y, x + w, y + h)
+        self.active[target_id] = True
+        self._insert(target_id, self._cells_of(target_id))
+        return target_id
+
+    def update(self, target_id, bbox):
+        """
+        Moves a target. Only the grid cells it leaves or enters are touched.
+        Args:
+            target_id: Id returned by `add`.
+            bbox: New bounding box (x, y, w, h) of the target.
+        """
+        self._check(target_id)
+        old_cells = self._cells_of(target_id)
+        x, y, w, h = bbox
+        self.boxes[target_id] = (x, y, x + w, y + h)
+        new_cells = self._cells_of(target_id)
+        if new_cells != old_cells:
+            self._discard(target_id, old_cells, keep=new_cells)
+            self._insert(target_id, new_cells, skip=old_cells)
+
+    def remove(self, target_id):
+        """
+        Removes a target, its id can be given to a new target.
+        """
+        self._check(target_id)
+        self._discard(target_id, self._cells_of(target_id))
+        self.active[target_id] = False
+        self._free.append(target_id)
+
+    def query(self, points, max_distance=None):
+        """
+        Finds the target under each point and the nearest target to each point.
+
+        Args:
+            points: Array of shape (n, 2) with the x, y of each point.
+            max_distance: Nearest targets further away than this are reported as -1.
+        Returns:
+            dict with, for each point, "inside" (id of the target containing it
+            with the lowest id, or -1), "nearest" (id of the closest target or -1)
+            and "distance" (distance to the edge of that target, 0 when inside)
+        """
+        points = np.asarray(points, np.float32).reshape(-1, 2)
+        px, py = points[:, 0], points[:, 1]
+
+        # Inside: only the targets of the cell under each point
+        gx = np.clip((px // self.cell_size).astype(np.int64), 0, self.grid_width - 1)
+        gy = np.clip((py // self.cell_size).astype(np.int64), 0, self.grid_height - 1)
+        candidates = self.cells[gy, gx]
+        boxes = self.boxes[np.maximum(candidates, 0)]
+        inside = (candidates >= 0) & \
+                 (px[:, None] >= boxes[..., 0]) & (px[:, None] < boxes[..., 2]) & \
+                 (py[:, None] >= boxes[..., 1]) & (py[:, None] < boxes[..., 3])
+        hits = np.where(inside, candidates, np.iinfo(np.int32).max).min(axis=1)
+        hits[~inside.any(axis=1)] = -1
+
+        # Nearest: distance from every point to the edge of every active target
+        ids = np.flatnonzero(self.active[:self.size])
+        if len(ids) == 0 or len(points) == 0:
+            return {
+                "inside": hits,
+                "nearest": np.full(len(points), -1, np.int64),
+                "distance": np.full(len(points), np.inf, np.float32),
+            }
+        active = self.boxes[ids]
+        dx = np.maximum(np.maximum(active[:, 0] - px[:, None], px[:, None] - active[:, 2]), 0)
+        dy = np.maximum(np.maximum(active[:, 1] - py[:, None], py[:, None] - active[:, 3]), 0)
+        distances = np.hypot(dx, dy)
+        closest = distances.argmin(axis=1)
+        nearest = ids[closest]
+        distance = distances[np.arange(len(points)), closest]
+        if max_distance is not None:
+            nearest = np.where(distance <= max_distance, nearest, -1)
+
+        return {"inside": hits, "nearest": nearest, "distance": distance}
+
+    def query_hands(self, hands, tip_ids=_TIP_IDS, max_distance=None):
+        """
+        Hit tests the fingertips of every hand returned by `HandDetector.find_hands`.
+        Args:
+            hands: List of hands.
+            tip_ids: Landmarks to test, the five fingertips by default.
+            max_distance: Nearest targets further away than this are reported as -1.
+        Returns:
+            Same as `query`, with arrays of shape (hands, tips)
+        """
+        points = fingertip_points(hands, tip_ids)
+        result = self.query(points, max_distance)
+        return {key: value.reshape(len(hands), len(tip_ids)) for key, value in result.items()}
+
+    def _cells_of(self, target_id):
+        x1, y1, x2, y2 = self.boxes[target_id]
+        if x2 <= x1 or y2 <= y1:
+            return 0, 0, 0, 0
+        gx1 = int(np.clip(x1 // self.cell_size, 0, self.grid_width - 1))
+        gy1 = int(np.clip(y1 // self.cell_size, 0, self.grid_height - 1))
+        gx2 = int(np.clip((x2 - 1) // self.cell_size, 0, self.grid_width - 1)) + 1
+        gy2 = int(np.clip((y2 - 1) // self.cell_size, 0, self.grid_height - 1)) + 1
+        return gx1, gy1, gx2, gy2
+
+    @staticmethod
+    def _grid_cells(cells, exclude=None):
+        """
+        Rows and columns of a (gx1, gy1, gx2, gy2) block of cells, without those of the exclude block.
+        """
+        gx1, gy1, gx2, gy2 = cells
+        rows, cols = np.mgrid[gy1:gy2, gx1:gx2]
+        rows, cols = rows.ravel(), cols.ravel()
+        if exclude is not None:
+            ex1, ey1, ex2, ey2 = exclude
+            outside = (cols < ex1) | (cols >= ex2) | (rows < ey1) | (rows >= ey2)
+            rows, cols = rows[outside], cols[outside]
+        return rows, cols
+
+    def _insert(self, target_id, cells, skip=None):
+        rows, cols = self._grid_cells(cells, skip)
+        if len(rows) == 0:
+            return
+        counts = self.counts[rows, cols]
+        if counts.max() == self.cells.shape[2]:
+            grown = np.full(self.cells.shape[:2] + (self.cells.shape[2] * 2,), -1, np.int32)
+            grown[:, :, :self.cells.shape[2]] = self.cells
+            self.cells = grown
+        self.cells[rows, cols, counts] = target_id
+        self.counts[rows, cols] = counts + 1
+
+    def _discard(self, target_id, cells, keep=None):
+        rows, cols = self._grid_cells(cells, keep)
+        if len(rows) == 0:
+            return
+        slots = (self.cells[rows, cols] == target_id).argmax(axis=1)
+        last = self.counts[rows, cols] - 1
+        # Move the last id of each cell into the freed slot
+        self.cells[rows, cols, slots] = self.cells[rows, cols, last]
+        self.cells[rows, cols, last] = -1
+        self.counts[rows, cols] = last
+
+    def _check(self, target_id):
+        if not 0 <= target_id < self.size or not self.active[target_id]:
+            raise KeyError(f"No target with id {target_id}")
+
+
+def fingertip_points(hands, tip_ids=_TIP_IDS):
+    """
+    Collects the fingertips of every hand in a single array.
+    Args:
+        hands: List of hands returned by `HandDetector.find_hands`.
+        tip_ids: Landmarks to collect, the five fingertips by default.
+    Returns:
+        Array of shape (hands * tips, 2) with the x, y of each fingertip
+    """
+    if not hands:
+        return np.zeros((0, 2), np.float32)
+    landmarks = np.array([hand["lmList"] for hand in hands], np.float32)
+    return landmarks[:, list(tip_ids), :2].reshape(-1, 2)
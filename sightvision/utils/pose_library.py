@@ -0,0 +1,174 @@
+import numpy as np
+
+_LEFT_SHOULDER, _RIGHT_SHOULDER = 11, 12
+_LEFT_HIP, _RIGHT_HIP = 23, 24
+
+
+def normalize_pose(lmList, landmark_ids=None):
+    """
+    Makes pose landmarks independent of where the person stands and how big it looks.
+    The hips center is moved to the origin and the torso length is scaled to 1.
+    Rows of 4 values are [id, x, y, z] as returned by `PoseDetector.find_position`,
+    rows of 2 or 3 values are [x, y] or [x, y, z].
+    Args:
+        lmList: Landmarks of one pose, shape (33, columns), or of several poses,
+                shape (poses, 33, columns), e.g. np.array of several find_position lists.
+        landmark_ids: Landmarks kept in the result, all of them by default.
+    Returns:
+        Array of shape (landmarks * 2,), or (poses, landmarks * 2) for several poses
+    """
+    points = np.asarray(lmList, np.float32)
+    if points.ndim not in (2, 3) or points.shape[-1] not in (2, 3, 4):
+        raise ValueError(f"Expected landmarks of shape (33, 2 to 4) or (poses, 33, 2 to 4), got {points.shape}")
+    single = points.ndim == 2
+    if single:
+        points = points[None]
+    # Drop the id column of find_position rows
+    points = points[..., 1:3] if points.shape[-1] == 4 else points[..., :2]
+
+    hips = (points[:, _LEFT_HIP] + points[:, _RIGHT_HIP]) / 2
+    shoulders = (points[:, _LEFT_SHOULDER] + points[:, _RIGHT_SHOULDER]) / 2
+    torso = np.linalg.norm(shoulders - hips, axis=1)
+
+    # Fall back on the spread of the landmarks when the torso is not visible
+    spread = np.sqrt(((points - hips[:, None]) ** 2).sum(axis=2).mean(axis=1))
+    scale = np.where(torso > 1e-6, torso, np.maximum(spread, 1e-6))
+
+    normalized = (points - hips[:, None]) / scale[:, None, None]
+    if landmark_ids is not None:
+        normalized = normalized[:, list(landmark_ids)]
+    normalized = normalized.reshape(len(normalized), -1)
+    return normalized[0] if single else normalized
+
+
+class PoseLibrary:
+    """
+    Library of reference poses searched for the closest matches of a frame.
+
+    The normalized reference poses are kept in one contiguous array, so a
+    frame is compared with every reference pose with a single matrix
+    product instead of angle checks in Python loops.
+    """
+
+    def __init__(self, landmark_ids=None):
+        """
+        Args:
+            landmark_ids: Landmarks compared, all 33 by default. Leaving out the
+                face (0 to 10) makes the match depend on the body only.
+        """
+        self.landmark_ids = landmark_ids
+        self.labels = []
+        # Chunks of normalized poses added since the last build
+        self._pending = []
+        self.poses = None
+        self._squared_norms = None
+
+    def __len__(self):
+        return len(self.labels)
+
+    def add(self, lmList, label=None):
+        """
+        Adds a reference pose.
+        Args:
+            lmList: Landmarks [id, x, y, z] returned by `PoseDetector.find_position`.
+            label: Name of the pose, defaults to its index.
+        Returns:
+            Index of the pose in the library
+        """
+        self._pending.append(normalize_pose(lmList, self.landmark_ids)[None])
+        self.labels.append(len(self.labels) if label is None else label)
+        return len(self.labels) - 1
+
+    def add_many(self, landmarks, labels=None):
+        """
+        Adds several reference poses at once.
+        Args:
+            landmarks: Array of shape (poses, 33, columns), with rows laid out as in
+                `normalize_pose`, e.g. np.array of several find_position lists.
+            labels: Name of each pose, defaults to their indexes.
+        """
+        normalized = normalize_pose(np.asarray(landmarks, np.float32), self.landmark_ids)
+        start = len(self.labels)
+        self._pending.append(normalized)
+        self.labels.extend(range(start, start + len(normalized)) if labels is None else labels)
+
+    def build(self):
+        """
+        Packs the poses added so far into the contiguous search array.
+        Called by the queries when poses were added since the last build.
+        """
+        if not self._pending:
+            return
+        pending = np.concatenate(self._pending).astype(np.float32, copy=False)
+        self.poses = pending if self.poses is None else np.concatenate([self.poses, pending])
+        self._squared_norms = (self.poses ** 2).sum(axis=1)
+        self._pending = []
+
+    def query(self, lmList, k=5):
+        """
+        Finds the reference poses closest to a pose.
+        Args:
+            lmList: Landmarks [id, x, y, z] returned by `PoseDetector.find_position`.
+            k: Number of matches.
+        Returns:
+            List of the k closest poses as dicts with "index", "label" and "distance",
+            closest first
+        """
+        if len(lmList) == 0 or not len(self):
+            return []
+        indexes, distances = self.query_batch(normalize_pose(lmList, self.landmark_ids)[None], k, normalized=True)
+        return [{"index": int(index), "label": self.labels[index], "distance": float(distance)}
+                for index, distance in zip(indexes[0], distances[0])]
+
+    def query_batch(self, poses, k=5, normalized=False):
+        """
+        Finds the closest reference poses of many poses at once.
+        Args:
+            poses: Array of shape (poses, 33, columns), with rows laid out as in
+                `normalize_pose`, e.g. np.array of several find_position lists.
+            k: Number of matches per pose.
+            normalized: The poses are already normalized with `normalize_pose`.
+        Returns:
+            Indexes and distances of the closest reference poses, both of shape
+            (poses, k), closest first
+        """
+        self.build()
+        if self.poses is None:
+            raise ValueError("The pose library is empty")
+
+        queries = np.asarray(poses, np.float32)
+        if not normalized:
+            queries = normalize_pose(queries, self.landmark_ids)
+        k = min(k, len(self.poses))
+
+        # |q - r|^2 = |q|^2 + |r|^2 - 2 q.r for every pair at once
+        squared = (queries ** 2).sum(axis=1)[:, None] + self._squared_norms[None] - 2 * queries @ self.poses.T
+        nearest = np.argpartition(squared, k - 1, axis=1)[:, :k]
+        nearest_squared = np.take_along_axis(squared, nearest, axis=1)
+        order = np.argsort(nearest_squared, axis=1)
+        indexes = np.take_along_axis(nearest, order, axis=1)
+        distances = np.sqrt(np.maximum(np.take_along_axis(nearest_squared, order, axis=1), 0))
+        return indexes, distances
+
+    def save(self, path):
+        """
+        Saves the library to a .npz file.
+        """
+        self.build()
+        poses = self.poses if self.poses is not None else np.zeros((0, 0), np.float32)
+        np.savez(path, poses=poses, labels=np.array(self.labels, dtype=str),
+                 landmark_ids=np.array(self.landmark_ids if self.landmark_ids is not None else [], np.int64))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a library saved with `save`. Labels are loaded as strings.
+        """
+        data = np.load(path)
+        landmark_ids = data["landmark_ids"].tolist() or None
+        library = cls(landmark_ids)
+        library.labels = data["labels"].tolist()
+        if len(data["poses"]):
+            library.poses = np.ascontiguousarray(data["poses"], np.float32)
+            library._squared_norms = (library.poses ** 2).sum(axis=1)
+        return library
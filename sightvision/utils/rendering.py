@@ -0,0 +1,96 @@
+import cv2
+import mediapipe as mp
+import numpy as np
+
+
+def connection_array(connections):
+    """
+    Turns a mediapipe connection set into an array of landmark index pairs.
+    Args:
+        connections: Set of (start, end) landmark indexes, e.g. mp.solutions.hands.HAND_CONNECTIONS.
+    Returns:
+        Array of shape (connections, 2)
+    """
+    return np.array(sorted(connections), np.int32).reshape(-1, 2)
+
+
+HAND_EDGES = connection_array(mp.solutions.hands.HAND_CONNECTIONS)
+POSE_EDGES = connection_array(mp.solutions.pose.POSE_CONNECTIONS)
+FACE_MESH_EDGES = connection_array(mp.solutions.face_mesh.FACEMESH_CONTOURS)
+
+
+def landmark_array(landmark_list, width, height):
+    """
+    Converts mediapipe normalized landmarks to pixel coordinates.
+    Args:
+        landmark_list: NormalizedLandmarkList returned by a mediapipe solution.
+        width: Width of the image in pixels.
+        height: Height of the image in pixels.
+    Returns:
+        Array of shape (landmarks, 3) with the x, y and visibility of each landmark
+    """
+    landmarks = np.array([(lm.x, lm.y, lm.visibility) for lm in landmark_list.landmark], np.float32)
+    landmarks[:, 0] *= width
+    landmarks[:, 1] *= height
+    return landmarks
+
+
+class LandmarkRenderer:
+    """
+    Draws landmark skeletons with one OpenCV call instead of one per line.
+
+    The connections of the topology are kept as an index array, so the
+    segments of every subject are gathered from the landmark array at once
+    and drawn with a single `cv2.polylines` call. Landmarks are drawn as
+    dots with a second call unless point_radius is None.
+    """
+
+    def __init__(self, edges, color=(224, 224, 224), thickness=2, point_color=(0, 0, 255), point_radius=2,
+                 antialias=False):
+        """
+        Args:
+            edges: Landmark index pairs, e.g. HAND_EDGES, POSE_EDGES or FACE_MESH_EDGES.
+            color: Color of the connections in BGR.
+            thickness: Thickness of the connections.
+            point_color: Color of the landmarks in BGR.
+            point_radius: Radius of the landmarks, None draws no landmark.
+            antialias: Smooth the lines, slower.
+        """
+        self.edges = np.asarray(edges, np.int32).reshape(-1, 2)
+        self.color = color
+        self.thickness = thickness
+        self.point_color = point_color
+        self.point_radius = point_radius
+        self.line_type = cv2.LINE_AA if antialias else cv2.LINE_8
+
+    def draw(self, img, points, visible=None):
+        """
+        Draws one or several subjects on the image.
+        Args:
+            img: Image to draw on.
+            points: Pixel coordinates of the landmarks, shape (landmarks, 2+) for one
+                subject or (subjects, landmarks, 2+) for several. Extra columns such as z
+                are ignored.
+            visible: Optional boolean mask of the same leading shape, landmarks that are not
+                visible and their connections are skipped.
+        Returns:
+            Image with the drawings
+        """
+        points = np.asarray(points)
+        if points.size == 0:
+            return img
+        points = points.reshape((-1,) + points.shape[-2:])[..., :2].astype(np.int32)
+
+        segments = points[:, self.edges]
+        if visible is not None:
+            visible = np.asarray(visible, bool).reshape(points.shape[:2])
+            segments = segments[visible[:, self.edges].all(axis=2)]
+        if len(segments):
+            cv2.polylines(img, segments.reshape(-1, 2, 2), False, self.color, self.thickness, self.line_type)
+
+        dots = points[visible] if visible is not None else points.reshape(-1, 2)
+        if self.point_radius is not None and len(dots):
+            # A polyline of a single point draws a round dot as wide as the line
+            cv2.polylines(img, np.repeat(dots[:, None], 2, axis=1), False, self.point_color,
+                          2 * self.point_radius + 1, self.line_type)
+        return img
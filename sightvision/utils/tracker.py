@@ -0,0 +1,152 @@
+import itertools
+import threading
+
+import numpy as np
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """
+    Intersection over union of every pair of (x, y, w, h) boxes.
+    Args:
+        boxes_a: Array of shape (n, 4).
+        boxes_b: Array of shape (m, 4).
+    Returns:
+        Array of shape (n, m)
+    """
+    a = np.asarray(boxes_a, np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, np.float32).reshape(-1, 4)
+    iw = np.minimum(a[:, None, 0] + a[:, None, 2], b[None, :, 0] + b[None, :, 2]) - \
+         np.maximum(a[:, None, 0], b[None, :, 0])
+    ih = np.minimum(a[:, None, 1] + a[:, None, 3], b[None, :, 1] + b[None, :, 3]) - \
+         np.maximum(a[:, None, 1], b[None, :, 1])
+    inter = np.maximum(iw, 0) * np.maximum(ih, 0)
+    union = (a[:, 2] * a[:, 3])[:, None] + (b[:, 2] * b[:, 3])[None] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0)
+
+
+def greedy_match(scores, threshold):
+    """
+    Pairs rows with columns, highest score first, each row and column used once.
+    Args:
+        scores: Array of shape (rows, columns), higher is better.
+        threshold: Pairs scoring below this are never matched.
+    Returns:
+        List of (row, column) pairs
+    """
+    scores = np.asarray(scores)
+    rows, cols = np.nonzero(scores >= threshold)
+    order = np.argsort(-scores[rows, cols], kind="stable")
+    used_rows, used_cols = set(), set()
+    pairs = []
+    for row, col in zip(rows[order].tolist(), cols[order].tolist()):
+        if row in used_rows or col in used_cols:
+            continue
+        used_rows.add(row)
+        used_cols.add(col)
+        pairs.append((row, col))
+    return pairs
+
+
+class BoxTracker:
+    """
+    Gives detections a track id that stays the same from frame to frame.
+
+    The boxes of a frame are matched with the known tracks by overlap
+    first, then by how close their centers are, for small or fast objects
+    whose boxes no longer overlap. Tracks that go unmatched for more than
+    `max_missed` frames expire, their ids are listed in `expired` so caches
+    keyed by track id can be cleared. Frames must be given in order.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_distance=0.5, max_missed=5, max_tracks=None):
+        """
+        Args:
+            iou_threshold: Minimum overlap to match a box with a track.
+            max_distance: Maximum distance between the centers of an unmatched box and
+                track, as a fraction of the track box diagonal. 0 matches by overlap only.
+            max_missed: Frames a track can go unmatched before it expires.
+            max_tracks: Maximum number of tracks, extra boxes get no track id.
+        """
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self.max_tracks = max_tracks
+
+        # One row per track
+        self.ids = np.zeros(0, np.int64)
+        self.boxes = np.zeros((0, 4), np.float32)
+        self.missed = np.zeros(0, np.int32)
+        self.expired = []
+        self._next_id = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def update(self, boxes):
+        """
+        Matches the boxes of a new frame with the tracks.
+        Args:
+            boxes: List of (x, y, w, h) boxes found in the frame.
+        Returns:
+            List with the track id of each box, None for boxes beyond max_tracks
+        """
+        boxes = np.asarray(boxes, np.float32).reshape(-1, 4)
+        with self._lock:
+            pairs = greedy_match(iou_matrix(self.boxes, boxes), self.iou_threshold)
+
+            if self.max_distance > 0 and len(pairs) < min(len(self.ids), len(boxes)):
+                pairs += self._match_centers(boxes, pairs)
+
+            track_ids = [None] * len(boxes)
+            matched = np.zeros(len(self.ids), bool)
+            for track, index in pairs:
+                track_ids[index] = int(self.ids[track])
+                self.boxes[track] = boxes[index]
+                matched[track] = True
+            self.missed = np.where(matched, 0, self.missed + 1)
+
+            # Expire the tracks that were lost for too long
+            keep = self.missed <= self.max_missed
+            self.expired = self.ids[~keep].tolist()
+            self.ids, self.boxes, self.missed = self.ids[keep], self.boxes[keep], self.missed[keep]
+
+            # Unmatched boxes start new tracks
+            new = [index for index, track_id in enumerate(track_ids) if track_id is None]
+            if self.max_tracks is not None:
+                new = new[:max(self.max_tracks - len(self.ids), 0)]
+            if new:
+                new_ids = np.array([next(self._next_id) for _ in new], np.int64)
+                for index, track_id in zip(new, new_ids.tolist()):
+                    track_ids[index] = track_id
+                self.ids = np.concatenate([self.ids, new_ids])
+                self.boxes = np.concatenate([self.boxes, boxes[new]])
+                self.missed = np.concatenate([self.missed, np.zeros(len(new), np.int32)])
+
+        return track_ids
+
+    def reset(self):
+        """
+        Forgets every track, e.g. when the video jumps to another scene.
+        """
+        with self._lock:
+            self.expired = self.ids.tolist()
+            self.ids = np.zeros(0, np.int64)
+            self.boxes = np.zeros((0, 4), np.float32)
+            self.missed = np.zeros(0, np.int32)
+
+    def _match_centers(self, boxes, pairs):
+        tracks = np.ones(len(self.ids), bool)
+        detections = np.ones(len(boxes), bool)
+        for track, index in pairs:
+            tracks[track] = False
+            detections[index] = False
+        track_rows, box_rows = np.flatnonzero(tracks), np.flatnonzero(detections)
+
+        track_centers = self.boxes[track_rows, :2] + self.boxes[track_rows, 2:] / 2
+        box_centers = boxes[box_rows, :2] + boxes[box_rows, 2:] / 2
+        distances = np.linalg.norm(track_centers[:, None] - box_centers[None], axis=2)
+        diagonals = np.maximum(np.linalg.norm(self.boxes[track_rows, 2:], axis=1), 1)
+        # Score 1 for centers at the same place down to 0 at max_distance
+        scores = 1 - distances / (diagonals[:, None] * self.max_distance)
+        return [(int(track_rows[row]), int(box_rows[col])) for row, col in greedy_match(scores, 0)]